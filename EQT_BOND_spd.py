@@ -1,8 +1,8 @@
-import pandas as pd
+from excel_cache import read_excel_cached
 
 # 读取数据
 file_path = 'EQT_BOND_spd.xlsx'
-data = pd.read_excel(file_path)
+data = read_excel_cached(file_path)
 
 # 检查列名
 print("文件中的列名：", data.columns)
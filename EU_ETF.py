@@ -1,8 +1,7 @@
+from headless import finish_figure
 import matplotlib.pyplot as plt
 import numpy as np
-from matplotlib.patches import Rectangle
 import matplotlib.patches as patches
-import matplotlib as mpl
 
 # 设置中文字体
 plt.rcParams['font.sans-serif'] = ['SimHei']  # 用来正常显示中文标签
@@ -75,4 +74,4 @@ ax.set_ylim(min(y_positions)-1, max(y_positions)+1.5)
 ax.axis('off')
 
 plt.tight_layout()
-plt.show()
+finish_figure(fig, headless_path='EU_ETF_classification.png', dpi=300, bbox_inches='tight')
@@ -1,92 +1,240 @@
-import pandas as pd
-import numpy as np
-from dash import Dash, dash_table, html
-import matplotlib.pyplot as plt
-import seaborn as sns
+import argparse
 import base64
-from io import BytesIO
-from dash.dependencies import Input, Output
+import hashlib
 import io
+import json
+import os
+import threading
+import time
+from functools import lru_cache
+
+import pandas as pd
+
+from bootstrap import CONFIDENCE, bootstrap_intervals, error_bars
+from chart_styles import cycle_colors
+from excel_cache import source_signature, write_sidecar_json
+from incremental_stats import refresh_metrics
+from price_store import store_lock, store_path
+from stoxx_metrics import format_results, load_prices
+from timeseries_view import VIEWS, timeseries_figure, zoom_range
+
+# Dash、matplotlib 只在对应的代码路径中导入：
+# python STOXX.py --metrics-only 只计算并打印指标表，不加载网页和绘图相关的模块
+
+# 看板内容（指标表和图表）由后台线程计算并放在进程内的缓存中，页面请求只读取缓存：
+# 启动时直接开始提供服务，CSV 修改后在 REFRESH_SECONDS 秒内自动刷新，版本号加一
+REFRESH_SECONDS = 5
+PAYLOAD_FILE = 'dashboard.json'
+PAYLOAD_LOCK_FILE = 'dashboard.lock'
+CODE_FILES = ('STOXX.py', 'stoxx_metrics.py', 'incremental_stats.py', 'bootstrap.py', 'chart_styles.py')
+
+_cache = {'version': 0, 'payload': None, 'thread': None}
+_cache_lock = threading.Lock()
 
-# 读取数据
-file_path = 'STOXX.csv'
-data = pd.read_csv(file_path, parse_dates=['Date'], index_col='Date')
 
-# 计算每日收益率
-returns = data.pct_change().dropna()
+# 创建柱状图，误差线为年化收益率的自助法置信区间（bootstrap_intervals 的结果），返回 base64 编码的 PNG
+def render_chart_png(intervals):
+    import matplotlib
+    matplotlib.use('Agg')  # 图表只渲染为 PNG 嵌入网页，服务器进程不需要图形界面
+    import matplotlib.pyplot as plt
 
-# 计算年化收益率
-annual_returns = returns.mean() * 252
+    fig, ax = plt.subplots(figsize=(8, 6))
+    colors = cycle_colors(len(intervals), plt.get_cmap('Set1').colors)  # 与 seaborn 的 "Set1" 调色板相同
+    ax.bar(intervals['指数'], intervals['年化收益率'], yerr=error_bars(intervals), color=colors, capsize=5)
+    ax.set_title(f'年化收益率和 {CONFIDENCE:.0%} 置信区间', fontproperties='SimHei')
+    ax.set_ylabel('年化收益率', fontproperties='SimHei')
+    ax.set_xlabel('指数', fontproperties='SimHei')
 
-# 计算年化波动率
-annual_volatility = returns.std() * np.sqrt(252)
+    # 将图表保存为图像
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png")
+    plt.close(fig)
+    return base64.b64encode(buf.getbuffer()).decode("utf8")
 
-# 假设无风险利率为0.02（2%）
-risk_free_rate = 0.02
 
-# 计算Sharpe Ratio
-sharpe_ratio = (annual_returns - risk_free_rate) / annual_volatility
+# 计算看板的全部内容：格式化的指标表和图表 PNG（base64），结果保存到价格存储目录下，
+# 重启时如果 CSV 和代码都没有变化就直接读取，不再计算指标、重抽样和绘图
+# 计算在看板内容自己的锁内进行：多个 WSGI 工作进程各自的刷新线程中只有一个计算，其余等待后直接读取结果
+def load_payload(file_path):
+    source = dict(source_signature(file_path), code=_code_digest())
+    store_dir = store_path(file_path)
+    path = os.path.join(store_dir, PAYLOAD_FILE)
+    with store_lock(store_dir, name=PAYLOAD_LOCK_FILE):
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                payload = json.load(f)
+            if payload['source'] == source:
+                return payload
 
-# 创建结果表格
-df_results = pd.DataFrame({
-    '指数': ['STOXX 600', 'STOXX 50', 'STOXX Mid 200'],
-    '年化收益率': annual_returns,
-    '年化波动率': annual_volatility,
-    'Sharpe Ratio': sharpe_ratio
-})
+        df_results = format_results(refresh_metrics(file_path))
+        intervals = bootstrap_intervals(load_prices(file_path).pct_change().dropna())
+        payload = {
+            'source': source,
+            'columns': list(df_results.columns),
+            'records': df_results.to_dict('records'),
+            'chart': render_chart_png(intervals),
+        }
+        # 先写临时文件再替换，避免读到写了一半的缓存
+        write_sidecar_json(path, payload)
+    return payload
 
-# 格式化为百分数
-df_results['年化收益率'] = df_results['年化收益率'].apply(lambda x: f'{x:.2%}')
-df_results['年化波动率'] = df_results['年化波动率'].apply(lambda x: f'{x:.2%}')
 
-# 创建柱状图
-fig, ax = plt.subplots(figsize=(8, 6))
-colors = sns.color_palette("Set1", n_colors=len(df_results))
-bars = ax.bar(df_results['指数'], annual_returns, yerr=annual_volatility, color=colors, capsize=5)
-ax.set_title('年化收益率和标准差', fontproperties='SimHei')
-ax.set_ylabel('年化收益率', fontproperties='SimHei')
-ax.set_xlabel('指数', fontproperties='SimHei')
+# 当前缓存的 (版本号, 看板内容)；还没有计算完成时内容为 None
+def current_payload():
+    with _cache_lock:
+        return _cache['version'], _cache['payload']
 
-# 设置Sharpe Ratio保留两位小数
-df_results['Sharpe Ratio'] = df_results['Sharpe Ratio'].apply(lambda x: round(x, 2))
 
-# 将图表保存为图像
-buf = BytesIO()
-plt.savefig(buf, format="png")
-data = base64.b64encode(buf.getbuffer()).decode("utf8")
+# CSV 有变化（或还没有缓存）时重新生成看板内容并更新版本号，返回是否更新
+def refresh_payload(file_path):
+    _, payload = current_payload()
+    if payload is not None and payload['source'] == dict(source_signature(file_path), code=_code_digest()):
+        return False
+    payload = load_payload(file_path)
+    with _cache_lock:
+        _cache['version'] += 1
+        _cache['payload'] = payload
+    return True
+
+
+# 启动后台线程，每隔 interval 秒检查一次 CSV 的修改时间和大小，有变化时刷新缓存；重复调用不会启动多个线程
+def start_refresher(file_path, interval=REFRESH_SECONDS):
+    def run():
+        while True:
+            try:
+                if refresh_payload(file_path):
+                    print(f"看板数据已更新（版本 {current_payload()[0]}）")
+            except Exception as e:
+                # 刷新失败时保留上一版的内容，下一轮再试
+                print(f"看板数据刷新失败: {type(e).__name__}: {e}")
+            time.sleep(interval)
+
+    with _cache_lock:
+        if _cache['thread'] is None:
+            _cache['thread'] = threading.Thread(target=run, name='stoxx-refresher', daemon=True)
+            _cache['thread'].start()
+
+
+# 相关代码文件的哈希，代码修改后缓存的看板内容失效
+@lru_cache(maxsize=None)
+def _code_digest():
+    digest = hashlib.sha256()
+    for path in CODE_FILES:
+        with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), path), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
 
 # 创建Dash应用程序
-app = Dash(__name__)
-
-app.layout = html.Div([
-    html.H1("STOXX 指数分析结果"),
-    dash_table.DataTable(
-        id='results-table',
-        columns=[{"name": "指数", "id": "指数"}] + [{"name": i, "id": i} for i in df_results.columns if i != '指数'],
-        data=df_results.to_dict('records'),
-        style_table={'width': '50%'},
-        style_cell={'textAlign': 'center'},
-        export_format='xlsx',  # 支持导出为Excel
-    ),
-    html.Button("导出为Excel", id="export-button"),
-    html.Img(src="data:image/png;base64,{}".format(data))
-])
-
-# 添加回调函数处理导出
-@app.callback(
-    Output('results-table', 'export_headers'),
-    [Input('export-button', 'n_clicks')]
-)
-def export_to_excel(n_clicks):
-    if n_clicks:
-        # 将DataFrame转换为Excel文件
-        output = io.BytesIO()
-        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-            df_results.to_excel(writer, index=False)
-        output.seek(0)
-        return {'Content-Type': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-                'Content-Disposition': 'attachment; filename=STOXX_Results.xlsx'}
-    return None
+# 布局是函数，每次打开页面时读取缓存中的当前版本，不做任何计算；
+# 页面上的定时器轮询版本号，后台刷新后只更新表格和图表
+# 折线图按当前缩放范围从服务器取降采样后的数据（见 timeseries_view）
+# 后台刷新线程在这里启动，WSGI 服务器使用 create_app(...).server 时同样生效；
+# use_reloader=True 时（debug 模式）Werkzeug 重载器的父进程只监视文件、不处理请求，不在其中启动
+def create_app(file_path='STOXX.csv', use_reloader=False):
+    from dash import Dash, ctx, dash_table, dcc, html, no_update
+    from dash.dependencies import Input, Output, State
+
+    if not use_reloader or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_refresher(file_path)
+
+    app = Dash(__name__)
+
+    def serve_layout():
+        version, payload = current_payload()
+        return html.Div([
+            html.H1("STOXX 指数分析结果"),
+            html.Div("数据计算中，稍后自动显示…" if payload is None else "", id='status'),
+            dash_table.DataTable(
+                id='results-table',
+                columns=_table_columns(payload),
+                data=[] if payload is None else payload['records'],
+                style_table={'width': '50%'},
+                style_cell={'textAlign': 'center'},
+                export_format='xlsx',  # 支持导出为Excel
+            ),
+            html.Button("导出为Excel", id="export-button"),
+            html.Img(id='chart', src=_chart_src(payload)),
+            dcc.Dropdown(id='timeseries-view', options=[{'label': label, 'value': value} for value, label in VIEWS.items()],
+                         value='price', clearable=False, style={'width': '50%'}),
+            dcc.Graph(id='timeseries'),
+            dcc.Store(id='timeseries-range', data=[None, None]),
+            dcc.Store(id='payload-version', data=version),
+            dcc.Interval(id='refresh-interval', interval=REFRESH_SECONDS * 1000),
+        ])
+
+    app.layout = serve_layout
+
+    # 缓存版本变化时更新页面上的表格和图表
+    @app.callback(
+        [Output('results-table', 'columns'), Output('results-table', 'data'), Output('chart', 'src'),
+         Output('status', 'children'), Output('payload-version', 'data')],
+        [Input('refresh-interval', 'n_intervals')],
+        [State('payload-version', 'data')]
+    )
+    def update_payload(n_intervals, shown_version):
+        version, payload = current_payload()
+        if payload is None or version == shown_version:
+            return no_update, no_update, no_update, no_update, no_update
+        return _table_columns(payload), payload['records'], _chart_src(payload), "", version
+
+    # 切换视图、横轴缩放 / 平移或数据更新后重新取当前范围内的降采样数据，当前横轴范围记录在 timeseries-range 中
+    # 不涉及横轴的 relayout 事件不重新取数据；切换视图时 uirevision 改变，横轴恢复完整范围
+    @app.callback(
+        [Output('timeseries', 'figure'), Output('timeseries-range', 'data')],
+        [Input('timeseries-view', 'value'), Input('timeseries', 'relayoutData'), Input('payload-version', 'data')],
+        [State('timeseries-range', 'data')]
+    )
+    def update_timeseries(view, relayout_data, version, shown_range):
+        if ctx.triggered_id == 'timeseries':
+            x_range = zoom_range(relayout_data)
+            if x_range is None:
+                return no_update, no_update
+        elif ctx.triggered_id == 'timeseries-view':
+            x_range = (None, None)
+        else:
+            x_range = shown_range or (None, None)
+        return timeseries_figure(file_path, view, *x_range), list(x_range)
+
+    # 添加回调函数处理导出
+    @app.callback(
+        Output('results-table', 'export_headers'),
+        [Input('export-button', 'n_clicks')]
+    )
+    def export_to_excel(n_clicks):
+        _, payload = current_payload()
+        if n_clicks and payload is not None:
+            # 将DataFrame转换为Excel文件
+            output = io.BytesIO()
+            with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+                pd.DataFrame(payload['records'], columns=payload['columns']).to_excel(writer, index=False)
+            output.seek(0)
+            return {'Content-Type': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+                    'Content-Disposition': 'attachment; filename=STOXX_Results.xlsx'}
+        return None
+
+    return app
+
+
+def _table_columns(payload):
+    if payload is None:
+        return []
+    return [{"name": "指数", "id": "指数"}] + [{"name": i, "id": i} for i in payload['columns'] if i != '指数']
+
+
+def _chart_src(payload):
+    return None if payload is None else "data:image/png;base64,{}".format(payload['chart'])
+
 
 if __name__ == '__main__':
-    app.run_server(debug=True)
+    parser = argparse.ArgumentParser(description='STOXX 指数年化收益率、波动率和 Sharpe Ratio')
+    parser.add_argument('--file', default='STOXX.csv', help='价格数据 CSV 文件')
+    parser.add_argument('--metrics-only', action='store_true', help='只打印指标表，不启动 Dash 应用')
+    args = parser.parse_args()
+
+    if args.metrics_only:
+        # 读取数据并计算指标：统计状态已保存时只处理上次运行之后新增的交易日
+        print(format_results(refresh_metrics(args.file)).to_string(index=False))
+    else:
+        app = create_app(args.file, use_reloader=True)
+        app.run(debug=True)
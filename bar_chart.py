@@ -1,3 +1,4 @@
+from headless import finish_figure
 import pandas as pd  # 导入pandas库并简写为pd
 import matplotlib.pyplot as plt  # 导入matplotlib.pyplot模块并简写为plt
 # 自定义一个包含多列数据的数据框DataFrame，包含类别和多列值
@@ -16,4 +17,4 @@ plt.xticks(rotation=0)  # 旋转x轴文本，使其水平显示
 plt.ylabel('Value')  # 设置y轴标签
 plt.title('Grouped Bar Chart')  # 设置图表标题
 plt.legend(title='Values')  # 添加图例，并设置标题为'Values'
-plt.show()
\ No newline at end of file
+finish_figure(headless_path='grouped_bar_chart.png', bbox_inches='tight')
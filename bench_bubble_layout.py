@@ -0,0 +1,88 @@
+import time
+
+import numpy as np
+
+from bubble_layout import force_directed_adjustment, pack_layout
+
+
+# 原始的纯 Python 双重循环实现，作为结果和速度的对照
+def reference_force_directed_adjustment(initial_positions, radii, iterations=50, repulsion=0.1, attraction=0.2):
+    positions = initial_positions.copy()
+    n = len(radii)
+
+    for _ in range(iterations):
+        forces = np.zeros_like(positions)
+
+        for i in range(n):
+            for j in range(n):
+                if i != j:
+                    dx = positions[i, 0] - positions[j, 0]
+                    dy = positions[i, 1] - positions[j, 1]
+                    distance = max(0.1, np.sqrt(dx**2 + dy**2))
+                    min_distance = radii[i] + radii[j]
+                    if distance < min_distance:
+                        force_magnitude = repulsion * (min_distance - distance) / min_distance
+                        if distance > 0:
+                            forces[i, 0] += dx / distance * force_magnitude
+                            forces[i, 1] += dy / distance * force_magnitude
+
+        for i in range(1, n):
+            dx = positions[i, 0] - positions[0, 0]
+            dy = positions[i, 1] - positions[0, 1]
+            distance = max(0.1, np.sqrt(dx**2 + dy**2))
+            min_safe_distance = radii[0] + radii[i]
+            if distance > min_safe_distance:
+                force_magnitude = min(attraction * (distance - min_safe_distance) / distance, 0.1)
+                forces[i, 0] += -dx / distance * force_magnitude
+                forces[i, 1] += -dy / distance * force_magnitude
+
+        positions += forces
+
+    return positions
+
+
+# 生成与真实数据类似的测试气泡：半径从大到小排列，随机散布在一个圆盘内
+def make_bubbles(n, seed=0):
+    rng = np.random.default_rng(seed)
+    weights = np.sort(rng.pareto(1.5, n) + 0.01)[::-1]
+    radii = 0.3 + 2.7 * np.sqrt((weights - weights.min()) / (weights.max() - weights.min()))
+    spread = np.sqrt(np.pi * (radii ** 2).sum())
+    positions = rng.uniform(-spread, spread, size=(n, 2))
+    positions[0] = 0
+    return positions, radii
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    # 原始实现在 n=5000 时需要数十分钟，只对较小规模运行对照
+    reference_max_bubbles = 600
+    # 关闭提前停止，与原始实现一样固定迭代 50 次
+    fixed = {'overlap_tol': None, 'step_tol': None}
+
+    print(f"{'n':>6} {'原始循环(s)':>12} {'稠密广播(s)':>12} {'网格邻域(s)':>12} {'圆堆积(s)':>12} {'最大偏差':>10}")
+    for n in (20, 600, 5000):
+        positions, radii = make_bubbles(n)
+
+        dense_time = grid_time = float('nan')
+        dense = grid = None
+        if n <= 1500:  # 稠密矩阵内存随 n² 增长，大规模时跳过
+            dense, dense_time = timed(force_directed_adjustment, positions, radii, method='dense', **fixed)
+        grid, grid_time = timed(force_directed_adjustment, positions, radii, method='grid', **fixed)
+        # 确定性的圆堆积布局（layout='pack'），不需要迭代
+        _, pack_time = timed(pack_layout, radii)
+
+        reference_time = float('nan')
+        max_error = float('nan')
+        if n <= reference_max_bubbles:
+            reference, reference_time = timed(reference_force_directed_adjustment, positions, radii)
+            max_error = max(np.abs(result - reference).max() for result in (dense, grid) if result is not None)
+        elif dense is not None:
+            max_error = np.abs(grid - dense).max()
+
+        print(f"{n:>6} {reference_time:>12.3f} {dense_time:>12.3f} {grid_time:>12.3f} {pack_time:>12.3f} "
+              f"{max_error:>10.2e}")
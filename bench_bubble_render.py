@@ -0,0 +1,64 @@
+import time
+from io import BytesIO
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+from bench_bubble_layout import make_bubbles
+from bubble_chart import add_bubble_styles, draw_bubble_chart
+
+
+# 原始的逐个气泡 add_patch + annotate 绘制方式，作为对照
+def reference_draw(ax, country_weights, positions, weight_column):
+    for i, (cn_country, weight, color, font_size, radius) in enumerate(zip(
+        country_weights['国家'],
+        country_weights[weight_column],
+        country_weights['color'],
+        country_weights['font_size'],
+        country_weights['radius']
+    )):
+        ax.add_patch(plt.Circle((positions[i, 0], positions[i, 1]), radius, color=color, alpha=0.7))
+        ax.annotate(f"{cn_country}\n{weight:.2%}", (positions[i, 0], positions[i, 1]),
+                    ha='center', va='center', fontsize=font_size)
+    ax.axis('equal')
+    ax.axis('off')
+
+
+# 生成 n 个国家的测试权重和位置
+def make_weights(n):
+    positions, _ = make_bubbles(n)
+    weights = np.sort(np.random.default_rng(0).pareto(1.5, n) + 0.01)[::-1]
+    country_weights = pd.DataFrame({'国家': [f'C{i}' for i in range(n)], 'weight': weights / weights.sum()})
+    return add_bubble_styles(country_weights, 'weight'), positions
+
+
+# 绘制并以 dpi 保存到内存，返回耗时
+def time_render(draw, country_weights, positions, dpi):
+    start = time.perf_counter()
+    fig, ax = plt.subplots(figsize=(16, 14))
+    draw(ax, country_weights, positions)
+    fig.savefig(BytesIO(), format='png', dpi=dpi)
+    plt.close(fig)
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    dpi = 100
+    print(f"{'n':>6} {'逐个绘制(s)':>12} {'批量绘制(s)':>12} {'显示标签数':>10}")
+    for n in (30, 600, 3000):
+        country_weights, positions = make_weights(n)
+        reference_time = time_render(lambda ax, w, p: reference_draw(ax, w, p, 'weight'),
+                                     country_weights, positions, dpi)
+        batch_time = time_render(lambda ax, w, p: draw_bubble_chart(ax, w, p, 'weight', ''),
+                                 country_weights, positions, dpi)
+
+        # 标签在绘制时才筛选，画一次后读取实际显示的标签数
+        fig, ax = plt.subplots(figsize=(16, 14))
+        draw_bubble_chart(ax, country_weights, positions, 'weight', '')
+        fig.canvas.draw()
+        shown = sum(artist.shown for artist in ax.artists if hasattr(artist, 'shown'))
+        plt.close(fig)
+        print(f"{n:>6} {reference_time:>12.3f} {batch_time:>12.3f} {shown:>10}")
@@ -0,0 +1,87 @@
+import argparse
+import os
+import shutil
+import time
+import tracemalloc
+import zipfile
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+
+from holdings_stream import stream_aggregate_weights
+from weight_aggregation import aggregate_weights
+
+DIMENSIONS = ['COUNTRY', 'INDUSTRY_GROUP', ('COUNTRY', 'INDUSTRY_GROUP')]
+
+
+# 生成 rows 行的合成持仓工作簿（国家、行业、权重三列），用只写模式写出
+def make_holdings_workbook(path, rows, n_countries=40, n_industries=60, seed=0):
+    rng = np.random.default_rng(seed)
+    countries = rng.integers(0, n_countries, rows)
+    industries = rng.integers(0, n_industries, rows)
+    weights = rng.pareto(1.5, rows) + 0.01
+    weights = weights / weights.sum()
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('Holdings')
+    ws.append(['COUNTRY', 'INDUSTRY_GROUP', 'Weightings'])
+    for country, industry, weight in zip(countries.tolist(), industries.tolist(), weights.tolist()):
+        ws.append([f'Country {country}', f'Industry {industry}', weight])
+    wb.save(path)
+    _add_dimension(path, f'A1:C{rows + 1}')
+
+
+# openpyxl 只写模式不写 <dimension> 元素；Excel 保存的文件都有该元素，
+# 缺少时 openpyxl 打开只读工作簿会先把整张表解析一遍来确定范围，对比就不公平了，这里补上
+def _add_dimension(path, ref):
+    patched = path + '.tmp'
+    with zipfile.ZipFile(path) as source, zipfile.ZipFile(patched, 'w', zipfile.ZIP_DEFLATED) as target:
+        for item in source.infolist():
+            with source.open(item) as reader, target.open(item.filename, 'w', force_zip64=True) as writer:
+                if item.filename.startswith('xl/worksheets/'):
+                    head = reader.read(4096).replace(b'</sheetPr>', f'</sheetPr><dimension ref="{ref}" />'.encode(), 1)
+                    writer.write(head)
+                shutil.copyfileobj(reader, writer)
+    os.replace(patched, path)
+
+
+# 运行 func 两次，返回 (结果, 耗时 s, tracemalloc 记录的峰值内存 MB)
+# tracemalloc 本身会明显拖慢逐行分配对象的代码，因此耗时在不跟踪内存的那一次中测量
+def measure(func):
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / 1024 ** 2
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='对比 pd.read_excel 汇总与流式汇总的峰值内存')
+    parser.add_argument('--rows', type=int, default=1_000_000, help='合成工作簿的行数')
+    parser.add_argument('--path', default=None, help='合成工作簿路径，已存在时直接复用')
+    args = parser.parse_args()
+
+    path = args.path or f'synthetic_holdings_{args.rows}.xlsx'
+    if not os.path.exists(path):
+        start = time.perf_counter()
+        make_holdings_workbook(path, args.rows)
+        print(f"已生成 {path} ({args.rows} 行, {os.path.getsize(path) / 1024 ** 2:.1f} MB, "
+              f"{time.perf_counter() - start:.1f}s)")
+
+    # 原有方式：读入整张表再汇总
+    expected, frame_time, frame_peak = measure(
+        lambda: aggregate_weights(pd.read_excel(path), DIMENSIONS, 'Weightings'))
+    # 流式汇总：逐行累加各组权重
+    streamed, stream_time, stream_peak = measure(lambda: stream_aggregate_weights(path, DIMENSIONS))
+
+    for dimension in DIMENSIONS:
+        pd.testing.assert_frame_equal(streamed[dimension], expected[dimension], check_exact=False, rtol=1e-9)
+
+    print(f"{'方式':<16} {'耗时(s)':>10} {'峰值内存(MB)':>14}")
+    print(f"{'read_excel':<16} {frame_time:>10.2f} {frame_peak:>14.1f}")
+    print(f"{'流式汇总':<16} {stream_time:>10.2f} {stream_peak:>14.1f}")
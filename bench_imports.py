@@ -0,0 +1,71 @@
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+# 启动开销检查：用 python -X importtime 测量各入口的导入耗时，并检查不应加载的重量级模块
+# 每一项为 (名称, 命令参数, 禁止加载的顶层模块)
+ENTRIES = [
+    ('stoxx_metrics', ['-c', 'import stoxx_metrics'], {'dash', 'matplotlib', 'seaborn', 'scipy'}),
+    ('STOXX.py --metrics-only', ['STOXX.py', '--metrics-only'], {'dash', 'matplotlib', 'seaborn', 'scipy'}),
+    ('bubble_layout', ['-c', 'import bubble_layout'], {'pandas', 'matplotlib', 'scipy'}),
+    ('weight_aggregation', ['-c', 'import weight_aggregation'], {'matplotlib', 'openpyxl', 'scipy'}),
+    ('excel_cache', ['-c', 'import excel_cache'], {'matplotlib', 'openpyxl', 'scipy'}),
+    ('render_cache', ['-c', 'import render_cache'], {'matplotlib', 'openpyxl', 'scipy'}),
+    ('bubble_chart', ['-c', 'import bubble_chart'], {'dash', 'seaborn', 'scipy'}),
+]
+
+# importtime 输出格式: "import time: self [us] | cumulative | imported package"
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+# 在新的解释器中运行一次，返回 (总导入耗时 ms, {顶层包: 累计耗时 ms}, 加载过的全部顶层包)
+# 同一个包最外层那次导入的累计时间最大，包含了它的全部子模块
+def measure(args):
+    env = dict(os.environ, MPLBACKEND='Agg')
+    result = subprocess.run([sys.executable, '-X', 'importtime'] + args, capture_output=True, text=True,
+                            env=env, cwd=os.path.dirname(os.path.abspath(__file__)))
+    if result.returncode != 0:
+        raise RuntimeError(f"{' '.join(args)} 运行失败:\n{result.stderr[-2000:]}")
+
+    total = 0
+    packages = {}
+    loaded = set()
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match is None:
+            continue
+        self_us, cumulative_us, _, name = match.groups()
+        total += int(self_us)
+        top = name.split('.')[0]
+        loaded.add(top)
+        packages[top] = max(packages.get(top, 0), int(cumulative_us) / 1000)
+    return total / 1000, packages, loaded
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='检查各入口的导入耗时和重量级依赖')
+    parser.add_argument('--repeat', type=int, default=3, help='每个入口重复测量次数，取最小值')
+    parser.add_argument('--max-ms', type=float, default=None, help='任一入口的导入耗时超过该值时视为失败')
+    args = parser.parse_args()
+
+    failures = []
+    print(f"{'入口':<26} {'导入(ms)':>10}  最慢的依赖包(ms)")
+    for name, command, forbidden in ENTRIES:
+        runs = [measure(command) for _ in range(args.repeat)]
+        total, packages, _ = min(runs, key=lambda run: run[0])
+        own = {name.split()[0].removesuffix('.py')}
+        slowest = sorted(((package, ms) for package, ms in packages.items() if package not in own | {'site', 'encodings'}),
+                         key=lambda item: -item[1])[:3]
+        print(f"{name:<26} {total:>10.1f}  " + ', '.join(f"{package} {ms:.0f}" for package, ms in slowest))
+
+        loaded = forbidden & set().union(*(run[2] for run in runs))
+        if loaded:
+            failures.append(f"{name} 加载了不应加载的模块: {', '.join(sorted(loaded))}")
+        if args.max_ms is not None and total > args.max_ms:
+            failures.append(f"{name} 导入耗时 {total:.1f} ms 超过上限 {args.max_ms:.1f} ms")
+
+    for failure in failures:
+        print(failure)
+    raise SystemExit(1 if failures else 0)
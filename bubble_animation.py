@@ -0,0 +1,107 @@
+import argparse
+import os
+from contextlib import contextmanager
+
+import matplotlib.pyplot as plt
+import numpy as np
+from matplotlib import animation
+
+from bubble_chart import add_bubble_styles, draw_bubble_chart, load_country_weights
+from bubble_layout import improved_layout
+
+
+# 按快照顺序生成国家权重气泡图动画
+# 每一帧都以上一帧的气泡位置作为初始位置做增量布局，避免每帧冷启动导致气泡跳动；
+# 整个过程只复用一个 figure，逐帧写入 MP4/GIF 或编号 PNG，不会把所有帧的图表都留在内存里
+def render_snapshot_animation(snapshot_files, output_path, title='STOXX 国家权重分布', fps=2, dpi=100,
+                              layout_mode='force'):
+    # 先汇总所有快照的权重（表格很小），用统一的权重范围计算气泡大小，保证各帧比例一致
+    snapshots = [load_country_weights(path, verbose=False) for path in snapshot_files]
+    min_weight = min(weights[weight_column].min() for weights, _, weight_column in snapshots)
+    max_weight = max(weights[weight_column].max() for weights, _, weight_column in snapshots)
+
+    fig, ax = plt.subplots(figsize=(16, 14))
+    previous_positions = {}
+    limit = 0.0
+
+    with _frame_writer(fig, output_path, fps, dpi) as write_frame:
+        for frame, (path, (country_weights, country_column, weight_column)) in enumerate(zip(snapshot_files, snapshots)):
+            country_weights = add_bubble_styles(country_weights, weight_column, min_weight, max_weight)
+            radii = country_weights['radius'].values
+            countries = country_weights[country_column].tolist()
+
+            # 第一帧冷启动，之后以上一帧的位置为初始位置
+            if previous_positions:
+                initial_positions = _warm_start_positions(countries, radii, previous_positions)
+                positions, info = improved_layout(radii, layout=layout_mode, initial_positions=initial_positions,
+                                                  return_info=True)
+            else:
+                positions, info = improved_layout(radii, layout=layout_mode, return_info=True)
+            previous_positions = dict(zip(countries, positions))
+            print(f"第 {frame + 1}/{len(snapshot_files)} 帧 {path}: 布局迭代 {info['iterations']} 次")
+
+            # 视野只扩大不缩小，避免画面随帧缩放
+            limit = max(limit, (np.abs(positions).max(axis=1) + radii).max() * 1.05)
+
+            ax.clear()
+            draw_bubble_chart(ax, country_weights, positions, weight_column, title, limit=limit)
+            ax.text(0.5, 0.02, os.path.splitext(os.path.basename(path))[0],
+                    transform=ax.transAxes, ha='center', fontsize=20)
+            write_frame(frame)
+
+    plt.close(fig)
+
+
+# 已出现过的国家沿用上一帧的位置，新出现的国家放在现有气泡外围
+def _warm_start_positions(countries, radii, previous_positions):
+    positions = np.zeros((len(countries), 2))
+    known = np.array([country in previous_positions for country in countries])
+    for i, country in enumerate(countries):
+        if known[i]:
+            positions[i] = previous_positions[country]
+
+    if known.any():
+        outer = (np.sqrt((positions[known] ** 2).sum(axis=1)) + radii[known]).max()
+    else:
+        outer = 0.0
+    new = np.flatnonzero(~known)
+    angles = np.arange(len(new)) * np.pi * (3 - np.sqrt(5))  # 黄金角，均匀分布在外圈
+    positions[new, 0] = (outer + radii[new]) * np.cos(angles)
+    positions[new, 1] = (outer + radii[new]) * np.sin(angles)
+    return positions
+
+
+# 根据输出路径选择帧写入方式：.mp4 使用 ffmpeg，.gif 使用 Pillow，其他路径视为编号 PNG 的输出目录
+@contextmanager
+def _frame_writer(fig, output_path, fps, dpi):
+    extension = os.path.splitext(output_path)[1].lower()
+    if extension == '.mp4':
+        writer = animation.FFMpegWriter(fps=fps)
+    elif extension == '.gif':
+        writer = animation.PillowWriter(fps=fps)
+    else:
+        os.makedirs(output_path, exist_ok=True)
+        yield lambda frame: fig.savefig(os.path.join(output_path, f'frame_{frame:04d}.png'), dpi=dpi)
+        return
+
+    with writer.saving(fig, output_path, dpi):
+        yield lambda frame: writer.grab_frame()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='按持仓快照生成国家权重气泡图动画')
+    parser.add_argument('output', help='输出路径：.mp4 / .gif 文件，或存放编号 PNG 的目录')
+    parser.add_argument('snapshots', nargs='+', help='按时间顺序排列的持仓快照文件，例如 STOXX_geo.xlsx')
+    parser.add_argument('--title', default='STOXX 国家权重分布')
+    parser.add_argument('--fps', type=int, default=2)
+    parser.add_argument('--dpi', type=int, default=100)
+    parser.add_argument('--layout', choices=['force', 'pack'], default='force')
+    args = parser.parse_args()
+
+    plt.rcParams['font.sans-serif'] = ['Microsoft YaHei', 'SimHei', 'SimSun', 'Arial Unicode MS']
+    plt.rcParams['axes.unicode_minus'] = False
+    plt.rcParams['font.size'] = 16
+
+    render_snapshot_animation(args.snapshots, args.output, title=args.title, fps=args.fps, dpi=args.dpi,
+                              layout_mode=args.layout)
+    print(f"动画已保存到 {args.output}")
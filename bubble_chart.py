@@ -0,0 +1,286 @@
+from functools import lru_cache
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+from matplotlib.artist import Artist
+from matplotlib.backends.backend_agg import RendererAgg
+from matplotlib.collections import PatchCollection
+from matplotlib.font_manager import FontProperties
+from matplotlib.lines import Line2D
+from matplotlib.patches import Circle
+from matplotlib.text import Text
+from matplotlib.transforms import Bbox
+
+from chart_styles import bubble_encodings
+from holdings_schema import ROLE_COLUMNS
+from holdings_stream import aggregate_holdings
+from weight_aggregation import aggregate_weights, translate_labels
+
+# 国家名称英文转中文映射（根据需要扩展）
+country_translation = {
+    'Germany': '德国',
+    'France': '法国',
+    'United Kingdom': '英国',
+    'Switzerland': '瑞士',
+    'Netherlands': '荷兰',
+    'Sweden': '瑞典',
+    'Spain': '西班牙',
+    'Italy': '意大利',
+    'Denmark': '丹麦',
+    'Finland': '芬兰',
+    'Belgium': '比利时',
+    'Norway': '挪威',
+    'Ireland': '爱尔兰',
+    'Austria': '奥地利',
+    'Portugal': '葡萄牙',
+    'Luxembourg': '卢森堡',
+    'Greece': '希腊',
+    'Poland': '波兰',
+    'Czech Republic': '捷克',
+    'Hungary': '匈牙利',
+    'Russia': '俄罗斯',
+    'Turkey': '土耳其',
+    'United States': '美国',
+    'Canada': '加拿大',
+    'Japan': '日本',
+    'China': '中国',
+    'Hong Kong': '香港',
+    'Taiwan': '台湾',
+    'South Korea': '韩国',
+    'Australia': '澳大利亚',
+    'New Zealand': '新西兰',
+    'Singapore': '新加坡',
+    'India': '印度',
+    'Brazil': '巴西',
+    'South Africa': '南非'
+}
+
+# 设置最小和最大气泡半径
+min_radius = 0.3  # 最小气泡半径
+max_radius = 3.0  # 最大气泡半径
+
+# 字体大小范围，权重越大字体越大（增大两倍）
+min_font_size = 14  # 原来是7，增大两倍
+max_font_size = 28  # 原来是14，增大两倍
+
+# 根据权重分组，将权重分为几个区间，相同区间使用相同颜色
+weight_bins = [0, 0.02, 0.05, 0.10, 0.15, 1.0]
+weight_labels = ['0-2%', '2-5%', '5-10%', '10-15%', '15%+']
+
+# 为每个权重组分配颜色
+color_map = {
+    '0-2%': '#8dd3c7',
+    '2-5%': '#ffffb3',
+    '5-10%': '#bebada',
+    '10-15%': '#fb8072',
+    '15%+': '#80b1d3'
+}
+
+
+# 读取持仓文件并按国家汇总权重，返回 (country_weights, country_column, weight_column)
+# 国家列和权重列由 holdings_schema 自动识别；超大文件逐行流式汇总，不读入完整的 DataFrame
+def load_country_weights(file_path, verbose=True):
+    country_column, weight_column = ROLE_COLUMNS['country'], ROLE_COLUMNS['weight']
+    country_weights = aggregate_holdings(file_path, [country_column])[country_column]
+    return _add_chinese_names(country_weights, verbose), country_column, weight_column
+
+
+# 在已读取的持仓数据（read_holdings 的结果，列名为标准名称）上按国家汇总权重，返回值同 load_country_weights
+def country_weights_from_data(data, verbose=True):
+    if verbose:
+        print("原始列名:", data.columns)
+        print("原始数据示例:\n", data.head())
+
+    country_column = ROLE_COLUMNS['country']
+    weight_column = ROLE_COLUMNS['weight']
+
+    # 按国家计算权重（权重列统一转为数值，百分比文本自动换算），按权重从大到小排序
+    country_weights = aggregate_weights(data, [country_column], weight_column)[country_column]
+    return _add_chinese_names(country_weights, verbose), country_column, weight_column
+
+
+# 添加中文国家名称列
+def _add_chinese_names(country_weights, verbose):
+    if verbose:
+        print("国家权重数据:\n", country_weights)
+    country_weights['国家'] = translate_labels(country_weights[ROLE_COLUMNS['country']], country_translation)
+    return country_weights
+
+
+# 计算每个气泡的半径、权重组、颜色和字体大小
+# min_weight / max_weight 默认取本表的最小和最大权重，动画中传入所有快照的范围，保证各帧比例一致
+# 所有编码由 chart_styles.bubble_encodings 一次算出；最小和最大权重相同时所有气泡取最大半径和字号
+def add_bubble_styles(country_weights, weight_column, min_weight=None, max_weight=None):
+    styles = bubble_encodings(country_weights[weight_column], (min_radius, max_radius), (min_font_size, max_font_size),
+                              weight_bins, [color_map[label] for label in weight_labels], min_weight, max_weight)
+
+    country_weights['radius'] = styles['radius']
+    country_weights['weight_group'] = pd.Categorical.from_codes(styles['group'], categories=weight_labels)
+    country_weights['color'] = styles['color']
+    country_weights['font_size'] = styles['font_size']
+    return country_weights
+
+
+# 在 ax 上绘制气泡图；limit 不为空时固定坐标范围为 [-limit, limit]，动画各帧保持同一视野
+# 所有气泡放进一个 PatchCollection 一次绘制；cull_labels=True 时跳过放不进气泡的标签
+def draw_bubble_chart(ax, country_weights, positions, weight_column, title, limit=None, cull_labels=True):
+    radii = country_weights['radius'].values
+
+    # 绘制气泡图
+    circles = [Circle((x, y), radius) for (x, y), radius in zip(positions, radii)]
+    ax.add_collection(PatchCollection(circles, facecolors=country_weights['color'].tolist(),
+                                      edgecolors='none', alpha=0.7))
+
+    # 设置图表标题和样式
+    ax.set_title(title, fontsize=36)  # 原来是18，增大两倍
+    if limit is None:
+        ax.autoscale_view()
+        ax.axis('equal')  # 确保圆形不变形
+    else:
+        ax.set_xlim(-limit, limit)
+        ax.set_ylim(-limit, limit)
+        ax.set_aspect('equal')
+
+    # 移除坐标轴刻度和标签
+    ax.set_xticks([])
+    ax.set_yticks([])
+    ax.axis('off')
+
+    # 添加国家标签
+    labels = [f"{cn_country}\n{weight:.2%}"
+              for cn_country, weight in zip(country_weights['国家'], country_weights[weight_column])]
+    _draw_labels(ax, positions, labels, country_weights['font_size'].values, radii, cull_labels)
+
+    # 添加图例
+    legend_elements = [Line2D([0], [0], marker='o', color='w',
+                              label=label, markerfacecolor=color_map[label], markersize=16)  # 原来是10，增大
+                       for label in weight_labels]
+    ax.legend(handles=legend_elements, title="权重区间", loc='lower right', fontsize=16, title_fontsize=20)  # 增大图例字体
+
+
+# 在气泡中心批量添加标签，cull_labels=True 时只保留能放进气泡的标签
+# 标签由一个图层在绘制时才生成：此时 tight_layout 等布局步骤已经完成，坐标轴的大小是最终的
+def _draw_labels(ax, positions, labels, font_sizes, radii, cull_labels):
+    font_sizes = np.broadcast_to(np.asarray(font_sizes, dtype=float), len(labels))
+    layer = _BubbleLabels(np.asarray(positions, dtype=float).reshape(-1, 2), labels, font_sizes,
+                          np.asarray(radii, dtype=float), cull_labels)
+    ax.add_artist(layer)
+    return layer
+
+
+# 气泡标签图层：每次绘制时按当前的坐标变换判断哪些标签放得进气泡，只绘制这些标签
+# 不参与 tight_layout 的边界计算（标签都在气泡内部，气泡已决定坐标范围）
+class _BubbleLabels(Artist):
+    def __init__(self, positions, labels, font_sizes, radii, cull_labels):
+        super().__init__()
+        self.positions, self.labels, self.font_sizes, self.radii = positions, labels, font_sizes, radii
+        self.cull_labels = cull_labels
+        self.shown = 0  # 最近一次绘制的标签数
+
+    def draw(self, renderer):
+        if not self.get_visible():
+            return
+        ax = self.axes
+        font = FontProperties()  # 与 ax.text 的默认字体相同，取当前的 rcParams
+        if self.cull_labels:
+            visible = np.flatnonzero(_labels_fit(ax, self.labels, self.font_sizes, self.radii, font))
+        else:
+            visible = range(len(self.labels))
+        for i in visible:
+            text = Text(self.positions[i, 0], self.positions[i, 1], self.labels[i], ha='center', va='center',
+                        fontproperties=font, fontsize=self.font_sizes[i])
+            text.set_figure(ax.figure)
+            text.set_transform(ax.transData)
+            text.draw(renderer)
+        self.shown = len(visible)
+
+    def get_window_extent(self, renderer=None):
+        return Bbox.null()
+
+
+# 判断每个标签能否放进对应的气泡：比较标签的外接矩形对角线和气泡直径（单位均为磅）
+def _labels_fit(ax, labels, font_sizes, radii, font):
+    # 先确定坐标范围和等比例缩放，再换算每个数据单位对应的磅数
+    ax.apply_aspect()
+    origin, unit = ax.transData.transform([(0, 0), (1, 0)])
+    points_per_unit = (unit[0] - origin[0]) * 72 / ax.figure.dpi
+
+    extents = np.array([_text_extent(label, font) for label in labels]).reshape(-1, 2)
+    width = extents[:, 0] * font_sizes
+    height = extents[:, 1] * font_sizes
+    return np.hypot(width, height) <= 2 * radii * points_per_unit
+
+
+# 文字尺寸缓存：以 1 磅字号的宽和高（磅）保存，实际尺寸按字号线性缩放
+# 缓存键包含字体（字族、字重、样式等），同一标签在同一字体下只测量一次
+def _text_extent(text, font):
+    key = font.copy()
+    key.set_size(100)
+    return _measure_text(text, key)
+
+
+@lru_cache(maxsize=None)
+def _measure_text(text, prop):
+    renderer = _measure_renderer()
+    lines = text.split('\n')
+    width = max(renderer.get_text_width_height_descent(line, prop, ismath=False)[0] for line in lines)
+    # 多行文字的行高按 matplotlib 默认的 1.2 倍行距估算
+    return width / 100, len(lines) * 1.2
+
+
+# 72 dpi 的离屏渲染器，测得的像素数即为磅数
+@lru_cache(maxsize=None)
+def _measure_renderer():
+    return RendererAgg(1, 1, 72)
+
+
+# 一次扫描同时得到两层权重：内层为 (外层, 内层) 的权重，外层为各组内层权重之和
+# 权重统一换算为占总权重的比例；返回按外层权重从大到小排列的 [(外层名称, 外层权重, 内层权重 Series)]，内层也按权重从大到小排列
+def nested_weights(data, outer_column, inner_column, weight_column):
+    inner = aggregate_weights(data, [(outer_column, inner_column)], weight_column)[(outer_column, inner_column)]
+    inner = inner.set_index([outer_column, inner_column])[weight_column]
+    inner = inner[inner > 0]
+    inner = inner / inner.sum()
+
+    # 外层权重直接在汇总后的小表上求和，不再扫描原始持仓
+    outer = inner.groupby(level=0).sum().sort_values(ascending=False)
+    return [(name, total, inner.loc[name].sort_values(ascending=False)) for name, total in outer.items()]
+
+
+# 绘制嵌套气泡图：外层为浅色大圆，内层按内层分类统一着色
+def draw_nested_bubble_chart(ax, groups, outer_positions, outer_radii, inner_positions, inner_radii, title,
+                             cull_labels=True):
+    # 内层分类在所有外层分组中使用同一种颜色
+    categories = sorted({name for _, _, inner in groups for name in inner.index})
+    palette = plt.get_cmap('tab20')
+    category_colors = {name: palette(i % palette.N) for i, name in enumerate(categories)}
+
+    # 外层和内层气泡各用一个 PatchCollection 绘制
+    ax.add_collection(PatchCollection([Circle(center, radius) for center, radius in zip(outer_positions, outer_radii)],
+                                      facecolors='#f0f0f0', edgecolors='#999999', linewidths=1.5))
+    inner_circles, inner_colors = [], []
+    for (_, _, inner), positions, radii in zip(groups, inner_positions, inner_radii):
+        inner_circles += [Circle(center, radius) for center, radius in zip(positions, radii)]
+        inner_colors += [category_colors[name] for name in inner.index]
+    ax.add_collection(PatchCollection(inner_circles, facecolors=inner_colors, edgecolors='none', alpha=0.8))
+
+    ax.set_title(title, fontsize=36)
+    ax.autoscale_view()
+    ax.axis('equal')
+    ax.axis('off')
+
+    # 外层标签放在外圆上方
+    for (outer_name, outer_weight, _), (cx, cy), radius in zip(groups, outer_positions, outer_radii):
+        label = country_translation.get(outer_name, outer_name)
+        ax.text(cx, cy + radius, f"{label} {outer_weight:.2%}", ha='center', va='bottom', fontsize=16,
+                fontweight='bold')
+
+    labels = [f"{name}\n{weight:.2%}" for _, _, inner in groups for name, weight in inner.items()]
+    _draw_labels(ax, np.concatenate(inner_positions), labels, 8, np.concatenate(inner_radii), cull_labels)
+
+    legend_elements = [Line2D([0], [0], marker='o', color='w', label=name,
+                              markerfacecolor=category_colors[name], markersize=12)
+                       for name in categories]
+    ax.legend(handles=legend_elements, title="行业", loc='center left', bbox_to_anchor=(1, 0.5),
+              fontsize=12, title_fontsize=16)
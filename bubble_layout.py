@@ -0,0 +1,425 @@
+import heapq
+import math
+
+import numpy as np
+
+# 气泡数量不超过该值时使用稠密广播计算（n×n 矩阵），否则使用网格邻域搜索
+DENSE_MAX_BUBBLES = 100
+
+# 力导向求解的默认收敛阈值：总重叠量和单步最大位移都低于阈值时提前停止
+OVERLAP_TOL = 1e-3
+STEP_TOL = 1e-3
+
+
+# 使用改进的布局算法，让外围小气泡紧贴在一起并向中心靠拢，同时避免与中间大气泡重叠
+# layout='force' 为环形初始位置加力导向微调，layout='pack' 为确定性的前沿链圆堆积
+# 传入 initial_positions（例如上一次的布局结果）时跳过环形初始化，直接从这些位置开始微调；
+# return_info=True 时额外返回求解信息（迭代次数和最终残差）
+def improved_layout(radii, padding=1.0, center_padding=1.2, layout='force', initial_positions=None,
+                    iterations=50, overlap_tol=OVERLAP_TOL, step_tol=STEP_TOL, return_info=False):
+    if layout == 'pack':
+        positions = pack_layout(radii)
+        if return_info:
+            converged = True if overlap_tol is not None and step_tol is not None else None
+            return positions, {'iterations': 0, 'overlap': 0.0, 'displacement': 0.0, 'converged': converged}
+        return positions
+    if layout != 'force':
+        raise ValueError(f"未知的布局算法: {layout}")
+
+    if initial_positions is not None:
+        return force_directed_adjustment(initial_positions, radii, iterations=iterations,
+                                         overlap_tol=overlap_tol, step_tol=step_tol, return_info=return_info)
+
+    n = len(radii)
+    positions = np.zeros((n, 2))
+
+    # 第一个气泡（最大的）放在中心
+    positions[0] = [0, 0]
+    center_radius = radii[0]
+
+    if n > 1:
+        # 计算剩余气泡的总面积
+        rest = np.asarray(radii[1:], dtype=float)
+        remaining_area = np.pi * np.sum(rest ** 2)
+
+        # 估计所有小气泡围绕中心气泡所需的圆环半径
+        # 中心气泡外围的圆环面积应该大致等于所有小气泡的总面积
+        ring_inner_radius = center_radius * center_padding  # 内圆半径，稍大于中心气泡半径
+        ring_area = remaining_area * 1.5  # 增加一些空间，避免过度拥挤
+        ring_outer_radius = np.sqrt(ring_area / np.pi + ring_inner_radius**2)
+
+        # 剩余气泡按平均角度间隔排列在圆环上
+        angles = np.arange(n - 1) * (2 * np.pi / (n - 1))
+
+        # 计算距离中心的半径（考虑气泡大小），最小和最大半径只计算一次
+        # 较大的气泡放置在内环，较小的放置在外环
+        bubble_size_factor = (rest - rest.min()) / (rest.max() - rest.min() + 0.001)
+        distance_from_center = ring_inner_radius + (ring_outer_radius - ring_inner_radius) * (1 - bubble_size_factor)
+
+        positions[1:, 0] = distance_from_center * np.cos(angles)
+        positions[1:, 1] = distance_from_center * np.sin(angles)
+
+    # 应用力导向算法微调位置，避免重叠
+    return force_directed_adjustment(positions, radii, iterations=iterations,
+                                     overlap_tol=overlap_tol, step_tol=step_tol, return_info=return_info)
+
+
+# 力导向算法微调位置，避免气泡重叠
+# 每次迭代的排斥力和吸引力都用 NumPy 数组一次性计算：
+# 气泡较少时直接广播成 n×n 矩阵，气泡较多时先用均匀网格找出可能重叠的邻居对，
+# 只对这些气泡对计算排斥力，复杂度从 O(n²) 降到接近 O(n)
+# iterations 是迭代次数上限：当气泡总重叠量不超过 overlap_tol 且单步最大位移不超过 step_tol 时提前停止，
+# 任一阈值为 None 表示不提前停止。return_info=True 时返回 (positions, info)，
+# info 包含实际迭代次数 iterations、最终位置上的总重叠量 overlap、最大位移 displacement
+# 以及是否收敛 converged（没有给出阈值时为 None）
+def force_directed_adjustment(initial_positions, radii, iterations=50, repulsion=0.1, attraction=0.2,
+                              method='auto', overlap_tol=OVERLAP_TOL, step_tol=STEP_TOL, return_info=False):
+    positions = np.array(initial_positions, dtype=float)
+    radii = np.asarray(radii, dtype=float)
+    n = len(radii)
+    early_stop = overlap_tol is not None and step_tol is not None
+    info = {'iterations': 0, 'overlap': 0.0, 'displacement': 0.0, 'converged': True if early_stop else None}
+    if n == 0:
+        return (positions, info) if return_info else positions
+
+    if method == 'auto':
+        method = 'dense' if n <= DENSE_MAX_BUBBLES else 'grid'
+    if method == 'dense':
+        repulsion_forces = _dense_repulsion
+    elif method == 'grid':
+        repulsion_forces = _grid_repulsion
+    else:
+        raise ValueError(f"未知的力计算方法: {method}")
+
+    def residuals():
+        # 计算气泡之间的排斥力（避免重叠）
+        forces, overlap = repulsion_forces(positions, radii, repulsion)
+        # 对于非中心气泡，添加向中心的吸引力
+        forces[1:] += _center_attraction(positions, radii, attraction)
+        # 残差：当前总重叠量和本步的最大位移
+        displacement = np.sqrt((forces ** 2).sum(axis=1)).max()
+        info.update(overlap=float(overlap), displacement=float(displacement))
+        if early_stop:
+            info['converged'] = bool(overlap <= overlap_tol and displacement <= step_tol)
+        return forces
+
+    for step in range(iterations):
+        forces = residuals()
+        if info['converged']:
+            break
+
+        # 更新位置
+        positions += forces
+        info['iterations'] = step + 1
+    else:
+        # 达到迭代上限：残差按最后一次更新后的位置重新计算
+        residuals()
+
+    return (positions, info) if return_info else positions
+
+
+# 稠密排斥力：一次广播出所有气泡对之间的向量和距离，同时返回总重叠量
+def _dense_repulsion(positions, radii, repulsion):
+    # 计算两两气泡之间的向量
+    delta = positions[:, None, :] - positions[None, :, :]
+    distance = np.maximum(0.1, np.sqrt((delta ** 2).sum(axis=2)))
+
+    # 两个气泡应该保持的最小距离（两个半径之和）
+    min_distance = radii[:, None] + radii[None, :]
+
+    # 只有距离小于最小距离的气泡对才施加排斥力，排除气泡自身
+    overlapping = distance < min_distance
+    np.fill_diagonal(overlapping, False)
+
+    # 排斥力与重叠程度成正比，方向为单位向量
+    overlap_depth = np.where(overlapping, min_distance - distance, 0.0)
+    magnitude = repulsion * overlap_depth / min_distance
+    forces = (delta * (magnitude / distance)[:, :, None]).sum(axis=1)
+
+    # 每对气泡在矩阵中出现两次
+    return forces, overlap_depth.sum() / 2
+
+
+# 网格排斥力：只对相邻网格内的气泡对计算
+def _grid_repulsion(positions, radii, repulsion):
+    n = len(radii)
+    forces = np.zeros_like(positions)
+
+    # 网格边长不小于最大可能的最小距离，重叠的气泡对必然落在相邻的 3×3 网格内
+    cell_size = max(2 * radii.max(), 0.1)
+    i, j = _neighbour_pairs(positions, cell_size)
+    if len(i) == 0:
+        return forces, 0.0
+
+    delta = positions[i] - positions[j]
+    distance = np.maximum(0.1, np.sqrt((delta ** 2).sum(axis=1)))
+    min_distance = radii[i] + radii[j]
+
+    overlapping = distance < min_distance
+    i, delta, distance, min_distance = i[overlapping], delta[overlapping], distance[overlapping], min_distance[overlapping]
+
+    scale = repulsion * (min_distance - distance) / min_distance / distance
+    forces[:, 0] = np.bincount(i, weights=delta[:, 0] * scale, minlength=n)
+    forces[:, 1] = np.bincount(i, weights=delta[:, 1] * scale, minlength=n)
+
+    # 每对气泡作为有序对出现两次
+    return forces, (min_distance - distance).sum() / 2
+
+
+# 用均匀网格找出所有相邻网格内的有序气泡对 (i, j)，i != j
+def _neighbour_pairs(positions, cell_size):
+    cells = np.floor(positions / cell_size).astype(np.int64)
+    cells -= cells.min(axis=0)
+
+    # 网格坐标编码为一维键值，四周各留一格，邻居偏移后仍为非负
+    width = cells[:, 1].max() + 3
+    keys = (cells[:, 0] + 1) * width + (cells[:, 1] + 1)
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+
+    n = len(positions)
+    pair_i, pair_j = [], []
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            # 在排序后的键值中查找邻居网格内的气泡区间
+            neighbour_keys = keys + dx * width + dy
+            lo = np.searchsorted(sorted_keys, neighbour_keys, side='left')
+            hi = np.searchsorted(sorted_keys, neighbour_keys, side='right')
+            counts = hi - lo
+            total = counts.sum()
+            if total == 0:
+                continue
+
+            # 把每个区间展开为气泡对
+            i = np.repeat(np.arange(n), counts)
+            offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+            j = order[np.repeat(lo, counts) + offsets]
+
+            keep = i != j
+            pair_i.append(i[keep])
+            pair_j.append(j[keep])
+
+    if not pair_i:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty
+    return np.concatenate(pair_i), np.concatenate(pair_j)
+
+
+# 非中心气泡受到的向中心吸引力
+def _center_attraction(positions, radii, attraction):
+    # 计算到中心的向量
+    delta = positions[1:] - positions[0]
+    distance = np.maximum(0.1, np.sqrt((delta ** 2).sum(axis=1)))
+
+    # 计算最小安全距离（避免与中心气泡重叠）
+    min_safe_distance = radii[0] + radii[1:]
+
+    # 如果距离大于最小安全距离，施加向中心的吸引力，吸引力与距离成正比，但有上限
+    magnitude = np.where(
+        distance > min_safe_distance,
+        np.minimum(attraction * (distance - min_safe_distance) / distance, 0.1),
+        0.0,
+    )
+    return -delta * (magnitude / distance)[:, None]
+
+
+# 前沿链（front-chain）圆堆积布局：按半径从大到小依次放置，
+# 每个新气泡都与前沿链上离中心最近的一对相邻气泡相切，保证气泡之间互不重叠。
+# 结果完全确定，不依赖迭代次数，最大的气泡固定在原点
+# 相邻气泡对的得分保存在堆中（链变化后失效的项在取出时丢弃），前沿链上的气泡登记在均匀网格中：
+# 新气泡与链上任何气泡都不相交时（绝大多数情况）不必沿链查找，整体接近 O(n log n)
+def pack_layout(radii, padding=0.0):
+    radii = np.asarray(radii, dtype=float)
+    n = len(radii)
+    positions = np.zeros((n, 2))
+    if n == 0:
+        return positions
+
+    # 按半径从大到小放置，padding 作为气泡之间的间隙
+    order = np.argsort(-radii, kind='stable')
+    r = (radii[order] + padding / 2).tolist()
+    x = [0.0] * n
+    y = [0.0] * n
+
+    # 第一个（最大的）气泡放在中心，第二个紧贴在它右侧
+    if n > 1:
+        x[1] = r[0] + r[1]
+    if n > 2:
+        _place(x, y, r, 1, 0, 2)
+
+        # 用前三个气泡初始化前沿链（双向循环链表）
+        next_node = [0] * n
+        prev_node = [0] * n
+        next_node[0], next_node[1], next_node[2] = 1, 2, 0
+        prev_node[0], prev_node[1], prev_node[2] = 2, 0, 1
+        in_chain = [False] * n
+        in_chain[0] = in_chain[1] = in_chain[2] = True
+        pairs = [(_pair_score(x, y, r, c, next_node[c]), c, next_node[c]) for c in range(3)]
+        heapq.heapify(pairs)
+        grid = {}
+        cell_size = 2 * sum(r) / n
+        for c in range(3):
+            _grid_add(grid, cell_size, x, y, r, c)
+        a, b = 0, 1
+
+        i = 3
+        while i < n:
+            _place(x, y, r, a, b, i)
+
+            # 沿前沿链向两侧查找与新气泡相交的气泡，距离按链上的弧长计算；
+            # 网格中没有与之相交的链上气泡时结果必然是不相交，跳过查找
+            collided = False
+            if _grid_hits_chain(grid, cell_size, x, y, r, i, in_chain):
+                j, k = next_node[b], prev_node[a]
+                sj, sk = r[b], r[a]
+                while True:
+                    if sj <= sk:
+                        if _intersects(x, y, r, j, i):
+                            # 与前方的气泡相交：把链截短到 a—j，重新放置
+                            b = j
+                            collided = True
+                            break
+                        sj += r[j]
+                        j = next_node[j]
+                    else:
+                        if _intersects(x, y, r, k, i):
+                            # 与后方的气泡相交：把链截短到 k—b，重新放置
+                            a = k
+                            collided = True
+                            break
+                        sk += r[k]
+                        k = prev_node[k]
+                    if j == next_node[k]:
+                        break
+            if collided:
+                # 截掉的气泡移出前沿链
+                c = next_node[a]
+                while c != b:
+                    in_chain[c] = False
+                    c = next_node[c]
+                next_node[a], prev_node[b] = b, a
+                continue
+
+            # 放置成功，把新气泡插入 a 和 b 之间
+            prev_node[i], next_node[i] = a, b
+            next_node[a] = prev_node[b] = i
+            in_chain[i] = True
+            _grid_add(grid, cell_size, x, y, r, i)
+            heapq.heappush(pairs, (_pair_score(x, y, r, a, i), a, i))
+            heapq.heappush(pairs, (_pair_score(x, y, r, i, b), i, b))
+
+            # 选出前沿链上离中心最近的一对相邻气泡；得分相同时（例如都与中心气泡相邻）
+            # 取从新气泡起沿链向前最先遇到的一对，与逐个扫描前沿链的结果一致
+            a, b = _closest_pair(pairs, next_node, in_chain, i)
+            i += 1
+
+    positions[order, 0] = x
+    positions[order, 1] = y
+    return positions
+
+
+# 从堆中取出得分最小的有效气泡对（仍相邻、都在前沿链上），失效的项直接丢弃；有效的项留在堆中
+def _closest_pair(pairs, next_node, in_chain, start):
+    tied = []
+    while pairs:
+        score, a, b = pairs[0]
+        if not (in_chain[a] and in_chain[b] and next_node[a] == b):
+            heapq.heappop(pairs)
+        elif not tied or score == tied[0][0]:
+            tied.append(heapq.heappop(pairs))
+        else:
+            break
+    for entry in tied:
+        heapq.heappush(pairs, entry)
+    if len(tied) == 1:
+        return tied[0][1], tied[0][2]
+
+    firsts = {entry[1]: entry[2] for entry in tied}
+    c = start
+    while c not in firsts:
+        c = next_node[c]
+    return c, firsts[c]
+
+
+# 把气泡 c 登记到它的外接正方形覆盖的所有网格中
+def _grid_add(grid, cell_size, x, y, r, c):
+    for key in _grid_cells(cell_size, x[c], y[c], r[c]):
+        grid.setdefault(key, []).append(c)
+
+
+def _grid_cells(cell_size, cx, cy, radius):
+    x0, x1 = math.floor((cx - radius) / cell_size), math.floor((cx + radius) / cell_size)
+    y0, y1 = math.floor((cy - radius) / cell_size), math.floor((cy + radius) / cell_size)
+    return [(gx, gy) for gx in range(x0, x1 + 1) for gy in range(y0, y1 + 1)]
+
+
+# 网格中是否有仍在前沿链上、且与气泡 i 相交的气泡
+def _grid_hits_chain(grid, cell_size, x, y, r, i, in_chain):
+    for key in _grid_cells(cell_size, x[i], y[i], r[i]):
+        for c in grid.get(key, ()):
+            if in_chain[c] and _intersects(x, y, r, c, i):
+                return True
+    return False
+
+
+# 把气泡 c 放在与气泡 a、b 同时相切的位置
+def _place(x, y, r, b, a, c):
+    dx, dy = x[b] - x[a], y[b] - y[a]
+    d2 = dx * dx + dy * dy
+    if d2:
+        a2 = (r[a] + r[c]) ** 2
+        b2 = (r[b] + r[c]) ** 2
+        if a2 > b2:
+            t = (d2 + b2 - a2) / (2 * d2)
+            s = np.sqrt(max(0.0, b2 / d2 - t * t))
+            x[c] = x[b] - t * dx - s * dy
+            y[c] = y[b] - t * dy + s * dx
+        else:
+            t = (d2 + a2 - b2) / (2 * d2)
+            s = np.sqrt(max(0.0, a2 / d2 - t * t))
+            x[c] = x[a] + t * dx - s * dy
+            y[c] = y[a] + t * dy + s * dx
+    else:
+        x[c] = x[a] + r[c]
+        y[c] = y[a]
+
+
+# 判断两个气泡是否重叠（留出微小的数值容差）
+def _intersects(x, y, r, a, b):
+    dr = r[a] + r[b] - 1e-6
+    dx, dy = x[b] - x[a], y[b] - y[a]
+    return dr > 0 and dr * dr > dx * dx + dy * dy
+
+
+# 相邻两个气泡的加权中点到原点的距离平方，用来选择下一个放置位置
+def _pair_score(x, y, r, a, b):
+    ab = r[a] + r[b]
+    dx = (x[a] * r[b] + x[b] * r[a]) / ab
+    dy = (y[a] * r[b] + y[b] * r[a]) / ab
+    return dx * dx + dy * dy
+
+
+# 近似最小外接圆：以面积加权的圆心为中心，半径取能包住所有气泡的最小值
+def enclosing_circle(positions, radii):
+    positions = np.asarray(positions, dtype=float)
+    radii = np.asarray(radii, dtype=float)
+    area = radii ** 2
+    center = (positions * area[:, None]).sum(axis=0) / area.sum()
+    radius = (np.sqrt(((positions - center) ** 2).sum(axis=1)) + radii).max()
+    return center, radius
+
+
+# 两层嵌套的圆堆积布局：先在每个外层分组内堆积内层气泡，再用各组的外接圆堆积外层
+# inner_radii 是每个外层分组的内层半径数组列表；返回外层圆心、外层半径以及每组内层气泡的绝对坐标
+def nested_pack_layout(inner_radii, padding=0.1):
+    inner_layouts = []
+    outer_radii = np.zeros(len(inner_radii))
+    for k, radii in enumerate(inner_radii):
+        positions = pack_layout(radii, padding=padding)
+        center, radius = enclosing_circle(positions, radii)
+        inner_layouts.append(positions - center)
+        outer_radii[k] = radius + padding
+
+    outer_positions = pack_layout(outer_radii, padding=padding)
+    inner_positions = [positions + outer_positions[k] for k, positions in enumerate(inner_layouts)]
+    return outer_positions, outer_radii, inner_positions
@@ -0,0 +1,54 @@
+import numpy as np
+
+# 图表的视觉编码（气泡半径、字号、分组颜色、饼图 / 柱状图配色）统一用数组运算一次算出，
+# 不逐行调用 lambda，数千个元素时开销也可以忽略
+
+
+# 把 values 从 [lo, hi] 线性映射到 [0, 1]，lo / hi 默认取 values 的最小和最大值
+# lo == hi（所有值相同或只有一个元素）时全部取 1，不做除零
+def normalize(values, lo=None, hi=None):
+    values = np.asarray(values, dtype=float)
+    if values.size == 0:
+        return values
+    lo = np.nanmin(values) if lo is None else lo
+    hi = np.nanmax(values) if hi is None else hi
+    span = hi - lo
+    if not span > 0:
+        return np.where(np.isnan(values), np.nan, 1.0)
+    return (values - lo) / span
+
+
+# 按区间分组，与 pd.cut(values, bins) 一致：第 i 组为 (bins[i], bins[i + 1]]，不在任何区间内的值为 -1
+def bin_codes(values, bins):
+    values = np.asarray(values, dtype=float)
+    bins = np.asarray(bins, dtype=float)
+    codes = np.searchsorted(bins, values, side='left') - 1
+    codes[~((values > bins[0]) & (values <= bins[-1]))] = -1
+    return codes
+
+
+# 按组代码从调色板取颜色，代码为 -1 时取 missing
+def take_colors(codes, palette, missing=None):
+    palette = np.array(list(palette) + [missing], dtype=object)
+    return palette[np.asarray(codes)]
+
+
+# 为 n 个类别（饼图扇区、柱子）依次分配调色板中的颜色，类别多于颜色时循环使用
+def cycle_colors(n, palette):
+    palette = np.array(list(palette), dtype=object)
+    return palette[np.arange(n) % len(palette)].tolist()
+
+
+# 气泡图的全部视觉编码：权重只归一化一次，
+# 半径按平方根映射（面积与权重成正比），字号线性映射，颜色按权重区间分组
+# 返回 {'radius', 'font_size', 'group'（区间代码）, 'color'}，均为与 weights 等长的数组
+def bubble_encodings(weights, radius_range, font_size_range, bins, palette, min_weight=None, max_weight=None):
+    weights = np.asarray(weights, dtype=float)
+    scaled = normalize(weights, min_weight, max_weight)
+    group = bin_codes(weights, bins)
+    return {
+        'radius': radius_range[0] + (radius_range[1] - radius_range[0]) * np.sqrt(scaled),
+        'font_size': font_size_range[0] + (font_size_range[1] - font_size_range[0]) * scaled,
+        'group': group,
+        'color': take_colors(group, palette),
+    }
@@ -1,5 +1,5 @@
+from headless import finish_figure
 import matplotlib.pyplot as plt
-import numpy as np
 
 # 示例数据
 categories = ['A', 'B', 'C', 'D']
@@ -14,5 +14,5 @@ plt.xlabel('Category')
 plt.ylabel('Value')
 plt.title('Bar Chart with Error Bars')
 
-# 显示图表
-plt.show() 
\ No newline at end of file
+# 保存并显示图表
+finish_figure(headless_path='error_bar_chart.png', bbox_inches='tight')
@@ -0,0 +1,137 @@
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+
+import pandas as pd
+
+# 列式旁路缓存目录：每个工作簿（及读取参数）对应一个 Parquet 文件和一个记录来源信息的 JSON 文件
+CACHE_DIR = '.xlsx_cache'
+
+
+# 读取 Excel 工作簿，优先使用 Parquet 旁路缓存
+# 缓存以源文件的修改时间和大小作为失效依据，源文件变化后自动重新解析 xlsx 并刷新缓存；
+# 未安装 pyarrow 时直接使用 pd.read_excel
+def read_excel_cached(file_path, **kwargs):
+    if not _parquet_available():
+        return pd.read_excel(file_path, **kwargs)
+
+    parquet_path, meta_path = sidecar_path(file_path, kwargs, '.parquet'), sidecar_path(file_path, kwargs, '.json')
+    source = source_signature(file_path)
+
+    if os.path.exists(parquet_path) and os.path.exists(meta_path):
+        with open(meta_path, encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta['source'] == source:
+            return _restore(pd.read_parquet(parquet_path), meta)
+
+    data = pd.read_excel(file_path, **kwargs)
+    _write_sidecar(data, parquet_path, meta_path, source)
+    return data
+
+
+# 源文件签名：修改时间（纳秒）和文件大小
+def source_signature(file_path):
+    stat = os.stat(file_path)
+    return {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+
+
+# 旁路文件路径：文件名加读取参数的哈希，不同的 sheet_name / header / usecols 分别缓存；suffix 为扩展名
+# 其他模块的派生缓存（例如 holdings_schema 的列识别结果）也用它在 CACHE_DIR 中取得路径
+def sidecar_path(file_path, options, suffix):
+    options = json.dumps(options, sort_keys=True, default=str)
+    digest = hashlib.sha256(f"{os.path.abspath(file_path)}|{options}".encode('utf-8')).hexdigest()[:16]
+    return os.path.join(CACHE_DIR, f"{os.path.basename(file_path)}.{digest}{suffix}")
+
+
+# 写入 JSON 旁路文件：先写临时文件再重命名，并发读取的进程不会读到写了一半的文件；
+# 临时文件名带进程号和线程号，同时写同一文件的进程 / 线程互不覆盖对方的临时文件
+# 价格存储的 meta.json、累计统计状态等其他目录中的 JSON 文件也用它写入
+def write_sidecar_json(path, payload):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False)
+    os.replace(temp_path, path)
+
+
+# Parquet 要求列名为字符串、每列类型一致：
+# 列名按位置改为 "0", "1", ...，原列名记录在 JSON 中；
+# 混有文本和数字的 object 列（例如权重列中的 '--'）以文本保存，读取时再把数字还原
+def _write_sidecar(data, parquet_path, meta_path, source):
+    frame = data.copy()
+    frame.columns = [str(i) for i in range(frame.shape[1])]
+    mixed = []
+    for i, column in enumerate(frame.columns):
+        if frame[column].dtype == object and frame[column].map(type).nunique() > 1:
+            frame[column] = frame[column].map(lambda v: v if pd.isna(v) else str(v))
+            mixed.append(i)
+
+    # 两个文件都先写临时文件再重命名，Parquet 在前、JSON 在后：
+    # 并发读取的进程不会读到写了一半的文件，JSON 中的来源信息与 Parquet 内容一致后才可见
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    temp_parquet = f"{parquet_path}.{os.getpid()}.tmp"
+    try:
+        frame.to_parquet(temp_parquet)
+    except (TypeError, ValueError) as e:
+        # 仍无法转换的表格不缓存，下次继续读取 xlsx
+        if os.path.exists(temp_parquet):
+            os.remove(temp_parquet)
+        print(f"警告: 无法为 {meta_path} 写入列式缓存: {e}")
+        return
+    os.replace(temp_parquet, parquet_path)
+
+    meta = {
+        'source': source,
+        'columns': [_encode_name(column) for column in data.columns],
+        'mixed': mixed,
+    }
+    write_sidecar_json(meta_path, meta)
+
+
+def _restore(frame, meta):
+    for i in meta['mixed']:
+        column = frame.columns[i]
+        numbers = pd.to_numeric(frame[column], errors='coerce')
+        frame[column] = numbers.astype(object).where(numbers.notna(), frame[column])
+    frame.columns = [_decode_name(name) for name in meta['columns']]
+    return frame
+
+
+# 列名可能是字符串、整数或浮点数（例如没有表头的工作簿），保存时保留类型
+def _encode_name(name):
+    if isinstance(name, (int, float)) and not isinstance(name, bool):
+        return {'number': name}
+    return str(name)
+
+
+def _decode_name(name):
+    return name['number'] if isinstance(name, dict) else name
+
+
+def _parquet_available():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+if __name__ == '__main__':
+    # 对比直接解析 xlsx 和读取列式缓存的耗时
+    files = sys.argv[1:] or ['STOXX_geo.xlsx', 'STOXX600_geo.xlsx', 'STOXX600_geo_US.xlsx', 'EQT_BOND_spd.xlsx']
+    print(f"{'文件':<24} {'xlsx(s)':>10} {'缓存(s)':>10} {'加速':>8}")
+    for path in files:
+        start = time.perf_counter()
+        expected = pd.read_excel(path)
+        xlsx_time = time.perf_counter() - start
+
+        read_excel_cached(path)  # 确保缓存已生成
+        start = time.perf_counter()
+        cached = read_excel_cached(path)
+        cache_time = time.perf_counter() - start
+
+        pd.testing.assert_frame_equal(cached, expected, check_dtype=False)
+        print(f"{path:<24} {xlsx_time:>10.4f} {cache_time:>10.4f} {xlsx_time / cache_time:>7.1f}x")
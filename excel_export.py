@@ -0,0 +1,93 @@
+from openpyxl import Workbook
+from openpyxl.chart import BubbleChart, PieChart, Reference, Series
+from openpyxl.chart.series import SeriesLabel, StrRef
+from openpyxl.drawing.image import Image
+from openpyxl.utils import get_column_letter, quote_sheetname
+from openpyxl.utils.dataframe import dataframe_to_rows
+
+from bubble_layout import improved_layout
+
+# 行数达到该值时默认使用 openpyxl 的只写（流式）模式，逐行写出，内存占用不随行数增长
+WRITE_ONLY_MIN_ROWS = 10000
+
+# 原生气泡图的横纵坐标写入数据表末尾的这两列，图表引用这两列的区域
+BUBBLE_POSITION_COLUMNS = ('气泡横坐标', '气泡纵坐标')
+
+
+# 一次性导出数据表和图表，只保存一次
+# native_chart 为 'pie' 或 'bubble' 时根据表中的 label_column / value_column 生成 Excel 原生图表，
+# 否则在 image_path 不为空时插入 matplotlib 生成的图片；
+# write_only=None 时根据行数自动选择普通模式或只写模式
+# 原生气泡图的位置取 positions，为空时按 radius 列（没有时按权重的平方根）用 layout 布局算法计算；
+# layout 应与生成 PNG 时相同（布局是确定性的），两者的气泡位置才一致
+def export_weights(table, output_path, sheet_title, image_path=None, anchor='D2', write_only=None,
+                   native_chart=None, label_column=None, value_column=None, positions=None, layout='force'):
+    if native_chart == 'bubble':
+        table = _with_bubble_positions(table, value_column, positions, layout)
+    if write_only is None:
+        write_only = len(table) >= WRITE_ONLY_MIN_ROWS
+
+    wb = Workbook(write_only=write_only)
+    if write_only:
+        ws = wb.create_sheet(sheet_title)
+    else:
+        ws = wb.active
+        ws.title = sheet_title
+
+    # 插入数据
+    for r in dataframe_to_rows(table, index=False, header=True):
+        ws.append(r)
+
+    # 插入图表
+    if native_chart is not None:
+        columns = list(table.columns)
+        chart = _native_chart(ws, native_chart, len(table), columns.index(label_column) + 1,
+                              columns.index(value_column) + 1,
+                              [columns.index(name) + 1 for name in BUBBLE_POSITION_COLUMNS if name in columns])
+        ws.add_chart(chart, anchor)
+    elif image_path is not None:
+        ws.add_image(Image(image_path), anchor)
+
+    # 保存Excel文件
+    wb.save(output_path)
+
+
+# 用工作表中的数据区域构建原生图表，数据从第 2 行开始（第 1 行为表头）
+# 气泡图的 position_cols 为横、纵坐标所在的列
+def _native_chart(ws, chart_type, n_rows, label_col, value_col, position_cols=()):
+    labels = Reference(ws, min_col=label_col, min_row=2, max_row=n_rows + 1)
+    values = Reference(ws, min_col=value_col, min_row=1, max_row=n_rows + 1)
+
+    if chart_type == 'pie':
+        chart = PieChart()
+        chart.add_data(values, titles_from_data=True)
+        chart.set_categories(labels)
+    elif chart_type == 'bubble':
+        # 一个系列覆盖所有行：横纵坐标为布局位置，气泡大小为权重，系列名称引用权重列的表头
+        x_col, y_col = position_cols
+        chart = BubbleChart()
+        chart.style = 18
+        series = Series(values=Reference(ws, min_col=y_col, min_row=2, max_row=n_rows + 1),
+                        xvalues=Reference(ws, min_col=x_col, min_row=2, max_row=n_rows + 1),
+                        zvalues=Reference(ws, min_col=value_col, min_row=2, max_row=n_rows + 1))
+        series.tx = SeriesLabel(strRef=StrRef(f"{quote_sheetname(ws.title)}!${get_column_letter(value_col)}$1"))
+        chart.series.append(series)
+        chart.x_axis.delete = True
+        chart.y_axis.delete = True
+        chart.legend = None
+    else:
+        raise ValueError(f"未知的原生图表类型: {chart_type}")
+
+    chart.width, chart.height = 16, 12
+    return chart
+
+
+# 在表的末尾加上气泡的横纵坐标列（不修改传入的表）
+def _with_bubble_positions(table, value_column, positions=None, layout='force'):
+    if positions is None:
+        radii = table['radius'].to_numpy() if 'radius' in table.columns else table[value_column].to_numpy() ** 0.5
+        positions = improved_layout(radii, layout=layout)
+    table = table.copy()
+    table[BUBBLE_POSITION_COLUMNS[0]] = positions[:, 0]
+    table[BUBBLE_POSITION_COLUMNS[1]] = positions[:, 1]
+    return table
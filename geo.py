@@ -1,57 +1,41 @@
-import pandas as pd
+from headless import finish_figure
 import matplotlib.pyplot as plt
-import seaborn as sns
-from openpyxl import Workbook
-from openpyxl.drawing.image import Image
-from openpyxl.utils.dataframe import dataframe_to_rows
+
+from chart_styles import cycle_colors
+from excel_export import export_weights
+from holdings_schema import ROLE_COLUMNS
+from holdings_stream import aggregate_holdings
+from render_cache import cached_render
 
 # 读取数据
 file_path = 'STOXX_geo.xlsx'
-data = pd.read_excel(file_path)
-print(data.columns)
-
-# 按INDUSTRY_GROUP计算权重
-industry_weights = data.groupby('INDUSTRY_GROUP')['Unnamed: 3'].sum().reset_index()
+industry_column, weight_column = ROLE_COLUMNS['industry'], ROLE_COLUMNS['weight']
 
-# 按权重从大到小排序
-industry_weights = industry_weights.sort_values(by='Unnamed: 3', ascending=False)
-
-# 只保留前10个，其余归为"Others"
-if len(industry_weights) > 10:
-    top_10 = industry_weights.head(10)
-    others = pd.DataFrame({
-        'INDUSTRY_GROUP': ['Others'],
-        'Unnamed: 3': [industry_weights['Unnamed: 3'][10:].sum()]
-    })
-    industry_weights = pd.concat([top_10, others])
+# 按INDUSTRY_GROUP计算权重，按权重从大到小排列，只保留前10个，其余归为"Others"
+# 自动识别行业列和权重列；小文件只读取这两列后汇总，超大文件逐行流式汇总
+industry_weights = aggregate_holdings(file_path, [industry_column], top_n=10)[industry_column]
 
 # 绘制饼图
-plt.figure(figsize=(8, 8))
 colors = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf', '#d3d3d3']
-plt.pie(industry_weights['Unnamed: 3'], labels=industry_weights['INDUSTRY_GROUP'], autopct='%1.1f%%', startangle=140, colors=colors)
-plt.title('Industry Group Weight Distribution')
-plt.show()
-
-# 导出为Excel
-output_file_path = 'STOXX_geo_industry_weights.xlsx'
-industry_weights.to_excel(output_file_path, index=False)
+pie_chart_path = 'industry_pie_chart.png'
+pie_chart_params = {'title': 'Industry Group Weight Distribution', 'colors': colors, 'figsize': (8, 8), 'startangle': 140}
 
-# 将饼图保存为Excel中的图表
-wb = Workbook()
-ws = wb.active
-ws.title = "Industry Weights"
 
-# 插入数据
-for r in dataframe_to_rows(industry_weights, index=False, header=True):
-    ws.append(r)
+def render_pie_chart(path):
+    fig = plt.figure(figsize=pie_chart_params['figsize'])
+    plt.pie(industry_weights[weight_column], labels=industry_weights[industry_column], autopct='%1.1f%%',
+            startangle=pie_chart_params['startangle'], colors=cycle_colors(len(industry_weights), colors))
+    plt.title(pie_chart_params['title'])
+    finish_figure(fig, path, bbox_inches='tight')
 
-# 插入饼图
-pie_chart_path = 'industry_pie_chart.png'
-plt.savefig(pie_chart_path, bbox_inches='tight')
 
-# 插入饼图
-img = Image(pie_chart_path)
-ws.add_image(img, 'D2')
+# 数据、参数和代码都没有变化时直接复用缓存的图片
+cached_render(pie_chart_path, industry_weights, pie_chart_params, render_pie_chart, code_files=[__file__])
 
-# 保存Excel文件
-wb.save(output_file_path)
+# 导出为Excel：数据和图表一次写入
+# excel_chart = 'native' 时使用 Excel 原生图表（文件更小、写入更快），'image' 时嵌入上面生成的 PNG
+excel_chart = 'image'
+output_file_path = 'STOXX_geo_industry_weights.xlsx'
+export_weights(industry_weights, output_file_path, "Industry Weights", image_path=pie_chart_path,
+               native_chart='pie' if excel_chart == 'native' else None,
+               label_column=industry_column, value_column=weight_column)
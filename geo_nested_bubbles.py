@@ -0,0 +1,50 @@
+from headless import finish_figure
+import pandas as pd
+import matplotlib.pyplot as plt
+import numpy as np
+
+from bubble_chart import draw_nested_bubble_chart, nested_weights
+from bubble_layout import nested_pack_layout
+from excel_export import export_weights
+from holdings_schema import ROLE_COLUMNS, read_holdings
+
+# 设置中文字体支持
+plt.rcParams['font.sans-serif'] = ['Microsoft YaHei', 'SimHei', 'SimSun', 'Arial Unicode MS']
+plt.rcParams['axes.unicode_minus'] = False  # 解决负号显示问题
+plt.rcParams['font.size'] = 16
+
+# 读取成分股持仓数据，需要行业和权重列；工作簿没有国家列时由 Bloomberg 证券代码的交易所推出国家，
+# 两者都没有时 read_holdings 抛出 ValueError 并列出缺少的列
+file_path = 'STOXX600_geo.xlsx'
+country_column, industry_column, weight_column = ROLE_COLUMNS['country'], ROLE_COLUMNS['industry'], ROLE_COLUMNS['weight']
+data = read_holdings(file_path, ['country', 'industry', 'weight'])
+print("原始列名:", data.columns)
+
+# 一次扫描同时得到 国家 → 行业 两层权重
+groups = nested_weights(data, country_column, industry_column, weight_column)
+for country, total, industries in groups:
+    print(f"{country}: 权重 = {total:.2%}, 行业数 = {len(industries)}")
+
+# 内层气泡面积与权重成正比，每一层的布局只计算一次
+radius_scale = 10.0  # 权重 1% 对应半径 1
+inner_radii = [radius_scale * np.sqrt(industries.values) for _, _, industries in groups]
+outer_positions, outer_radii, inner_positions = nested_pack_layout(inner_radii)
+
+# 创建嵌套气泡图
+fig, ax = plt.subplots(figsize=(18, 16))
+draw_nested_bubble_chart(ax, groups, outer_positions, outer_radii, inner_positions, inner_radii,
+                         'STOXX 600 国家-行业权重分布')
+
+# 保存图表
+plt.tight_layout()
+bubble_chart_path = 'STOXX600_country_industry_bubble_chart.png'
+finish_figure(fig, bubble_chart_path, dpi=300, bbox_inches='tight')
+
+# 导出国家-行业权重
+output_file_path = 'STOXX600_country_industry_weights.xlsx'
+nested_table = pd.concat({country: industries for country, _, industries in groups},
+                         names=[country_column, industry_column]).rename('权重').reset_index()
+export_weights(nested_table, output_file_path, "Country Industry Weights", image_path=bubble_chart_path)
+
+print(f"已生成国家-行业嵌套气泡图并保存为 {bubble_chart_path}")
+print(f"数据已保存到Excel文件 {output_file_path}")
@@ -0,0 +1,41 @@
+import os
+import sys
+
+import matplotlib
+
+# 无界面模式：命令行加 --headless 或设置环境变量 VIZ_HEADLESS=1 时启用
+# 启用后强制使用 Agg 后端，不弹出窗口、不阻塞，适合批量任务和服务器环境。
+# 后端在导入本模块时切换，各脚本需要在导入 matplotlib.pyplot 之前导入本模块
+HEADLESS_FLAG = '--headless'
+HEADLESS_ENV = 'VIZ_HEADLESS'
+
+
+def headless_requested(argv=None, environ=None):
+    argv = sys.argv if argv is None else argv
+    environ = os.environ if environ is None else environ
+    return HEADLESS_FLAG in argv or environ.get(HEADLESS_ENV, '').strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+HEADLESS = headless_requested()
+if HEADLESS:
+    matplotlib.use('Agg')
+    # 去掉命令行中的 --headless，使用 argparse 的脚本不会把它当成未知参数
+    sys.argv[:] = [arg for arg in sys.argv if arg != HEADLESS_FLAG]
+    # 子进程（例如 run_charts 的工作进程）沿用同一模式
+    os.environ[HEADLESS_ENV] = '1'
+
+
+# 完成一张图：先保存（path 不为空时），再按模式决定是否显示，最后显式关闭图形释放内存
+# 保存必须在 plt.show() 之前，否则在非交互后端或窗口关闭后保存的是空白图
+# headless_path 只在无界面模式下保存，供交互运行时只显示图形的脚本使用，避免每次运行都在当前目录留下 PNG
+def finish_figure(fig=None, path=None, headless_path=None, **savefig_kwargs):
+    import matplotlib.pyplot as plt
+
+    fig = plt.gcf() if fig is None else fig
+    if path is None and HEADLESS:
+        path = headless_path
+    if path is not None:
+        fig.savefig(path, **savefig_kwargs)
+    if not HEADLESS:
+        plt.show()
+    plt.close(fig)
@@ -0,0 +1,222 @@
+import json
+import os
+import re
+import sys
+
+import numpy as np
+import pandas as pd
+
+from excel_cache import read_excel_cached, sidecar_path, source_signature, write_sidecar_json
+from weight_aggregation import numeric_weights
+
+# 持仓工作簿的列识别：找出表头所在行以及国家 / 行业 / 权重列的位置，
+# 之后只读取用到的列（usecols），并统一改为下面的标准列名
+ROLE_COLUMNS = {
+    'country': 'COUNTRY',
+    'industry': 'INDUSTRY_GROUP',
+    'weight': 'Weightings',
+    'ticker': 'TICKER',
+}
+
+# 各角色可识别的表头名称（比较时忽略大小写、空格、下划线和百分号）
+ROLE_SYNONYMS = {
+    'country': {'country', 'countryofrisk', 'countryname', 'cntry', '国家', '地区', '国家地区', '国家/地区'},
+    'industry': {'industrygroup', 'industry', 'sector', 'gicssector', 'gicsindustrygroup', '行业', '行业组'},
+    'weight': {'weightings', 'weighting', 'weight', 'weights', 'wgt', 'indexweight', 'pctweight', '权重', '占比'},
+    'ticker': {'ticker', 'bbgticker', 'bloombergticker', 'securityticker', '代码', '证券代码'},
+}
+
+# Bloomberg 证券代码（如 "ASML NA Equity"）及其交易所代码对应的国家，
+# 工作簿没有国家列时由证券代码推出国家；名称与 bubble_chart.country_translation 的键一致
+TICKER_PATTERN = re.compile(r'^\S+ ([A-Z]{2}) Equity$')
+EXCHANGE_COUNTRIES = {
+    'LN': 'United Kingdom', 'FP': 'France', 'GR': 'Germany', 'SS': 'Sweden', 'SW': 'Switzerland',
+    'IM': 'Italy', 'NA': 'Netherlands', 'DC': 'Denmark', 'SM': 'Spain', 'FH': 'Finland',
+    'BB': 'Belgium', 'NO': 'Norway', 'PW': 'Poland', 'AV': 'Austria', 'ID': 'Ireland',
+    'PL': 'Portugal', 'LX': 'Luxembourg', 'GA': 'Greece', 'CP': 'Czech Republic', 'HB': 'Hungary',
+    'US': 'United States',
+}
+
+# 识别规则变化时递增，使 .xlsx_cache 中旧的识别结果失效
+SCHEMA_VERSION = 2
+
+# 在前 HEADER_SCAN_ROWS 行中寻找表头，再用其后 SAMPLE_ROWS 行判断各列的类型
+HEADER_SCAN_ROWS = 10
+SAMPLE_ROWS = 50
+# 样本中可解析为数字的单元格比例达到该值时视为数值列
+NUMERIC_SHARE = 0.8
+# 权重转为 float32 后相对误差不超过该值时以 float32 保存（汇总时仍按 float64 累加），否则保留 float64
+FLOAT32_RTOL = 1e-6
+
+
+# 识别工作簿的列结构，返回 {'header': 表头行号或 None, 'columns': {角色: 列位置}, 'width': 列数}
+# 结果按源文件的修改时间和大小缓存在 .xlsx_cache 中，文件不变时不再重新识别
+def resolve_schema(file_path, sheet_name=0):
+    schema_path = sidecar_path(file_path, {'schema': SCHEMA_VERSION, 'sheet_name': sheet_name}, '.schema.json')
+    source = source_signature(file_path)
+
+    if os.path.exists(schema_path):
+        with open(schema_path, encoding='utf-8') as f:
+            cached = json.load(f)
+        if cached['source'] == source:
+            return cached['schema']
+
+    sample = pd.read_excel(file_path, sheet_name=sheet_name, header=None, nrows=HEADER_SCAN_ROWS + SAMPLE_ROWS)
+    schema = detect_schema(sample)
+
+    write_sidecar_json(schema_path, {'source': source, 'schema': schema})
+    return schema
+
+
+# 在不带表头读取的前若干行上识别列结构
+def detect_schema(sample):
+    header, columns = _find_header(sample)
+    rows = sample.iloc[(0 if header is None else header + 1):]
+
+    numeric = [i for i in range(sample.shape[1]) if _is_numeric_column(rows.iloc[:, i])]
+    if 'weight' not in columns:
+        # 表头中没有权重列名时，取最后一个数值列；形如 1, 2, 3, ... 的序号列除外
+        candidates = [i for i in numeric if i not in columns.values() and not _is_row_number(rows.iloc[:, i])]
+        if candidates:
+            columns['weight'] = candidates[-1]
+    if 'ticker' not in columns:
+        # 表头中没有代码列名时，取大部分值形如 "ASML NA Equity" 的文本列
+        tickers = [i for i in range(sample.shape[1]) if i not in columns.values() and i not in numeric
+                   and _is_ticker_column(rows.iloc[:, i])]
+        if tickers:
+            columns['ticker'] = tickers[0]
+    if header is None and 'country' not in columns:
+        # 没有表头时，第一个文本列作为国家（名称）列
+        text = [i for i in range(sample.shape[1])
+                if i not in numeric and i not in columns.values() and rows.iloc[:, i].notna().any()]
+        if text:
+            columns['country'] = text[0]
+
+    return {'header': header, 'columns': columns, 'width': int(sample.shape[1])}
+
+
+# 读取持仓数据，只解析 roles 对应的列，列名改为 ROLE_COLUMNS 中的标准名称
+# 国家、行业等标签列为 Categorical，权重列在精度允许时为 float32
+# roles 为空时读取识别出的全部角色；没有国家列但有 Bloomberg 证券代码列时，国家由代码中的交易所推出；
+# 缺少所需的列时抛出 ValueError
+def read_holdings(file_path, roles=None, sheet_name=0):
+    schema = resolve_schema(file_path, sheet_name)
+    columns = schema['columns']
+    if roles is None:
+        roles = [role for role in ROLE_COLUMNS if role in columns]
+    roles = list(roles)
+    if 'country' in roles and 'country' not in columns and 'ticker' in columns:
+        data = read_holdings(file_path, [role for role in roles if role not in ('country', 'ticker')] + ['ticker'],
+                             sheet_name)
+        data[ROLE_COLUMNS['country']] = country_from_ticker(data[ROLE_COLUMNS['ticker']])
+        return data[[ROLE_COLUMNS[role] for role in roles]]
+    missing = [role for role in roles if role not in columns]
+    if missing:
+        raise ValueError(f"{file_path} 中未能识别以下列: {', '.join(ROLE_COLUMNS[role] for role in missing)}")
+
+    positions = sorted(columns[role] for role in roles)
+    # 标签列由 read_excel 直接按文本读取（dtype 的整数键为 usecols 中的位置），避免数字形式的代码被解析为数值；
+    # 含空单元格的文本列无法在解析时直接转为 category，读取后再转换
+    label_positions = [columns[role] for role in roles if role != 'weight']
+    data = read_excel_cached(file_path, sheet_name=sheet_name, header=schema['header'], usecols=positions,
+                             dtype={positions.index(position): 'str' for position in label_positions})
+    data.columns = positions
+    renamed = {columns[role]: ROLE_COLUMNS[role] for role in roles}
+    data = data.rename(columns=renamed)[[ROLE_COLUMNS[role] for role in roles]]
+
+    for position in label_positions:
+        data[renamed[position]] = data[renamed[position]].astype('category')
+    if 'weight' in roles:
+        data[ROLE_COLUMNS['weight']] = compact_weights(numeric_weights(data[ROLE_COLUMNS['weight']]))
+    return data
+
+
+# 由 Bloomberg 证券代码的交易所代码得到国家名称（Categorical），每个不同的代码只解析一次
+def country_from_ticker(tickers):
+    tickers = pd.Series(tickers).astype('category')
+    countries = np.array([ticker_country(ticker) for ticker in tickers.cat.categories] + [None], dtype=object)
+    return pd.Series(countries[tickers.cat.codes.to_numpy()], index=tickers.index, dtype='category')
+
+
+# 单个证券代码对应的国家：不在 EXCHANGE_COUNTRIES 中的交易所保留交易所代码本身，不符合代码格式时为 None
+def ticker_country(ticker):
+    match = TICKER_PATTERN.match(str(ticker))
+    if match is None:
+        return None
+    return EXCHANGE_COUNTRIES.get(match.group(1), match.group(1))
+
+
+# 权重转为 float32 后的误差在 FLOAT32_RTOL 以内时返回 float32，否则返回 float64
+def compact_weights(values):
+    values = values.astype('float64')
+    compact = values.astype('float32')
+    with np.errstate(invalid='ignore', over='ignore'):
+        error = np.abs(compact.to_numpy(dtype='float64') - values.to_numpy())
+        allowed = FLOAT32_RTOL * np.abs(values.to_numpy())
+    if np.all((error <= allowed) | values.isna().to_numpy()):
+        return compact
+    return values
+
+
+# 第一行含有已知列名的行视为表头；都没有时，首行含数字则认为没有表头，否则首行为表头
+def _find_header(sample):
+    for row in range(min(HEADER_SCAN_ROWS, len(sample))):
+        columns = {}
+        for i, value in enumerate(sample.iloc[row]):
+            role = _match_role(value)
+            if role is not None and role not in columns:
+                columns[role] = i
+        if columns:
+            return row, columns
+
+    first_row = sample.iloc[0] if len(sample) else pd.Series(dtype=object)
+    if any(_is_number(value) for value in first_row):
+        return None, {}
+    return 0, {}
+
+
+def _match_role(value):
+    if not isinstance(value, str):
+        return None
+    key = value.strip().lower().replace(' ', '').replace('_', '').replace('%', '')
+    for role, synonyms in ROLE_SYNONYMS.items():
+        if key in synonyms:
+            return role
+    return None
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and not pd.isna(value)
+
+
+def _is_numeric_column(values):
+    values = values.dropna()
+    if values.empty:
+        return False
+    parsed = numeric_weights(values.astype(object).map(lambda v: v if _is_number(v) else str(v)))
+    placeholders = values.astype(str).str.strip().isin(['--', '-', ''])
+    present = (~placeholders).sum()
+    return present > 0 and parsed.notna().sum() >= NUMERIC_SHARE * present
+
+
+def _is_ticker_column(values):
+    values = values.dropna().astype(str)
+    return len(values) > 0 and values.str.match(TICKER_PATTERN).mean() >= NUMERIC_SHARE
+
+
+def _is_row_number(values):
+    values = pd.to_numeric(values.dropna(), errors='coerce').dropna()
+    if len(values) < 2:
+        return False
+    steps = values.diff().dropna()
+    return bool((values % 1 == 0).all() and (steps == 1).all())
+
+
+if __name__ == '__main__':
+    # 打印各工作簿识别出的列结构
+    files = sys.argv[1:] or ['STOXX_geo.xlsx', 'STOXX600_geo.xlsx', 'STOXX600_geo_US.xlsx']
+    for path in files:
+        schema = resolve_schema(path)
+        print(f"{path}: 表头行 = {schema['header']}, 列数 = {schema['width']}, "
+              + ', '.join(f"{ROLE_COLUMNS[role]} -> 第 {i} 列" for role, i in sorted(schema['columns'].items())))
+        print(read_holdings(path).head(3))
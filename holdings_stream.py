@@ -0,0 +1,166 @@
+import os
+
+import numpy as np
+from openpyxl import load_workbook
+
+# 逐行移除已解析行的快速路径依赖 openpyxl 的内部接口（已在 openpyxl 3.1 上验证），
+# 这些接口不存在时退回公开的 iter_rows（只读模式），结果相同但内存占用随行数增长
+try:
+    from openpyxl.worksheet._reader import DATA_TAG, ROW_TAG, WorkSheetParser, iterparse
+except ImportError:
+    WorkSheetParser = None
+
+from holdings_schema import ROLE_COLUMNS, read_holdings, resolve_schema, ticker_country
+from weight_aggregation import _top_n_table, aggregate_weights
+
+# 文件达到该大小（字节）时默认改用流式汇总：逐行读取并累加各组权重，不构建完整的 DataFrame
+STREAM_MIN_BYTES = 20 * 1024 * 1024
+
+ROLES_BY_COLUMN = {column: role for role, column in ROLE_COLUMNS.items()}
+
+
+# 按维度汇总持仓文件中的权重，参数和返回值同 weight_aggregation.aggregate_weights，
+# 维度使用 ROLE_COLUMNS 中的标准列名（如 'INDUSTRY_GROUP' 或 ('COUNTRY', 'INDUSTRY_GROUP')）
+# stream=None 时根据文件大小自动选择：小文件读入 DataFrame 后汇总（可利用 Parquet 缓存），大文件流式汇总
+def aggregate_holdings(file_path, dimensions, top_n=None, others_label='Others', sheet_name=0, stream=None):
+    if stream is None:
+        stream = os.path.getsize(file_path) >= STREAM_MIN_BYTES
+    if stream:
+        return stream_aggregate_weights(file_path, dimensions, top_n, others_label, sheet_name)
+
+    roles = _dimension_roles(dimensions) + ['weight']
+    data = read_holdings(file_path, roles, sheet_name)
+    return aggregate_weights(data, dimensions, ROLE_COLUMNS['weight'], top_n, others_label)
+
+
+# 用 openpyxl 只读模式逐行读取，只保留每个维度每个组的累计权重，内存占用取决于组数而不是行数
+# 与 read_holdings 一致：没有国家列但有 Bloomberg 证券代码列时，国家由代码中的交易所推出（每个代码只解析一次）
+def stream_aggregate_weights(file_path, dimensions, top_n=None, others_label='Others', sheet_name=0):
+    schema = resolve_schema(file_path, sheet_name)
+    columns = dict(schema['columns'])
+    derive_country = 'country' not in columns and 'ticker' in columns
+    if derive_country:
+        columns['country'] = columns['ticker']
+    missing = [role for role in _dimension_roles(dimensions) + ['weight'] if role not in columns]
+    if missing:
+        raise ValueError(f"{file_path} 中未能识别以下列: {', '.join(ROLE_COLUMNS[role] for role in missing)}")
+
+    # 每个维度的 ((列位置, 是否由证券代码推出国家), ...)
+    keys = [tuple((columns[ROLES_BY_COLUMN[column]], derive_country and ROLES_BY_COLUMN[column] == 'country')
+                  for column in _dimension_columns(dimension))
+            for dimension in dimensions]
+    weight_position = columns['weight']
+    sums = [{} for _ in dimensions]
+    countries = {}
+
+    first_row = 1 if schema['header'] is None else schema['header'] + 2
+    width = max(max(position for position, _ in key) for key in keys + [((weight_position, False),)]) + 1
+    for row in _iter_values(file_path, sheet_name, first_row, width):
+        weight = _weight_value(row[weight_position])
+        for key_columns, group_sums in zip(keys, sums):
+            labels = []
+            for position, derived in key_columns:
+                label = row[position]
+                if label is not None and derived:
+                    if label not in countries:
+                        countries[label] = ticker_country(label)
+                    label = countries[label]
+                if label is None:
+                    break
+                labels.append(str(label))
+            else:
+                key = tuple(labels)
+                group_sums[key] = group_sums.get(key, 0.0) + weight
+
+    results = {}
+    for dimension, group_sums in zip(dimensions, sums):
+        dimension_columns = _dimension_columns(dimension)
+        group_labels = [np.array([key[i] for key in group_sums], dtype=object) for i in range(len(dimension_columns))]
+        totals = np.fromiter(group_sums.values(), dtype=float, count=len(group_sums))
+        results[dimension] = _top_n_table(dimension_columns, group_labels, totals, ROLE_COLUMNS['weight'],
+                                          top_n, others_label)
+    return results
+
+
+# 逐行返回工作表前 width 列的值（列表，缺失的单元格为 None），跳过 first_row 之前的行
+# openpyxl 只读模式的 iter_rows 解析完一行后只清空 <row> 元素，不把它从 <sheetData> 中移除，
+# 空元素随行数累积；这里沿用 openpyxl 的单元格解析，但每解析完一行就将其移除，内存占用与行数无关
+def _iter_values(file_path, sheet_name, first_row, width):
+    wb = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[sheet_name] if isinstance(sheet_name, int) else wb[sheet_name]
+        parser = _row_parser(wb, ws)
+        if parser is None:
+            for row in ws.iter_rows(min_row=first_row, max_col=width, values_only=True):
+                yield list(row) + [None] * (width - len(row))
+            return
+        with parser.source:
+            for index, cells in parser.parse():
+                if index < first_row:
+                    continue
+                values = [None] * width
+                for cell in cells:
+                    column = cell['column'] - 1
+                    if column < width:
+                        values[column] = cell['value']
+                yield values
+    finally:
+        wb.close()
+
+
+# 用 openpyxl 的内部接口创建逐行移除的解析器，这些接口不可用时返回 None
+def _row_parser(wb, ws):
+    if WorkSheetParser is None:
+        return None
+    try:
+        source = ws._get_source()
+    except AttributeError:
+        return None
+    try:
+        return _RowParser(source, ws._shared_strings, data_only=True, epoch=wb.epoch,
+                          date_formats=wb._date_formats, timedelta_formats=wb._timedelta_formats)
+    except AttributeError:
+        source.close()
+        return None
+
+
+if WorkSheetParser is not None:
+    class _RowParser(WorkSheetParser):
+        def parse(self):
+            sheet_data = None
+            for event, element in iterparse(self.source, events=('start', 'end')):
+                if event == 'start':
+                    if element.tag == DATA_TAG:
+                        sheet_data = element
+                elif element.tag == ROW_TAG:
+                    yield self.parse_row(element)
+                    sheet_data.remove(element)
+
+
+def _dimension_columns(dimension):
+    return dimension if isinstance(dimension, tuple) else (dimension,)
+
+
+def _dimension_roles(dimensions):
+    roles = []
+    for dimension in dimensions:
+        for column in _dimension_columns(dimension):
+            if ROLES_BY_COLUMN[column] not in roles:
+                roles.append(ROLES_BY_COLUMN[column])
+    return roles
+
+
+# 单元格中的权重转为数值：与 numeric_weights 一致，百分号文本按百分比换算，无法解析的值（如 '--'）记为 0
+def _weight_value(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return 0.0 if value != value else float(value)
+    if not isinstance(value, str):
+        return 0.0
+    text = value.strip()
+    scale = 1.0
+    if text.endswith('%'):
+        text, scale = text[:-1], 0.01
+    try:
+        return float(text) * scale
+    except ValueError:
+        return 0.0
@@ -0,0 +1,153 @@
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from excel_cache import write_sidecar_json
+from price_store import load_prices, store_build, store_path, sync_csv
+from stoxx_metrics import RISK_FREE_RATE, TRADING_DAYS, INDEX_NAMES, compute_metrics
+
+# 日收益率的增量统计：每个序列保存样本数、均值和离差平方和 M2（Welford 算法），
+# 新的交易日到来时只处理新增的行，与已有状态按 Chan 的合并公式合并，耗时 O(新增行数)
+# 状态保存在价格存储目录下的 stats.json 中，包含最后一天的日期和价格，用于计算下一天的收益率，
+# 以及所基于的存储的构建编号（存储重建后状态失效）
+STATE_FILE = 'stats.json'
+
+
+# 空状态：还没有处理任何价格
+def empty_state(columns, build=None):
+    m = len(columns)
+    return {'columns': list(columns), 'count': 0, 'mean': [0.0] * m, 'm2': [0.0] * m,
+            'last_date': None, 'last_prices': None, 'build': build}
+
+
+# 用新的价格行（日期升序，不含状态中已处理的日期）更新状态，返回新的状态
+# 与 compute_metrics 一致：收益率为相邻两天价格的变化率，任一序列收益率缺失的日期整行跳过
+def update_state(state, prices):
+    if prices.empty:
+        return state
+    values = prices[state['columns']].to_numpy(dtype=np.float64)
+    if state['last_prices'] is not None:
+        values = np.vstack([np.asarray(state['last_prices'], dtype=np.float64), values])
+    returns = values[1:] / values[:-1] - 1
+    returns = returns[~np.isnan(returns).any(axis=1)]
+
+    state = dict(state, last_date=pd.Timestamp(prices.index[-1]).isoformat(), last_prices=values[-1].tolist())
+    if len(returns) == 0:
+        return state
+
+    # 新增部分的均值和 M2，再与已有状态合并
+    n_a, n_b = state['count'], len(returns)
+    mean_a, m2_a = np.asarray(state['mean']), np.asarray(state['m2'])
+    mean_b = returns.mean(axis=0)
+    m2_b = ((returns - mean_b) ** 2).sum(axis=0)
+    n = n_a + n_b
+    delta = mean_b - mean_a
+    state['count'] = n
+    state['mean'] = (mean_a + delta * n_b / n).tolist()
+    state['m2'] = (m2_a + m2_b + delta ** 2 * n_a * n_b / n).tolist()
+    return state
+
+
+# 由状态计算年化收益率、年化波动率和 Sharpe Ratio，格式与 compute_metrics 相同
+def metrics_from_state(state, risk_free_rate=RISK_FREE_RATE):
+    columns = state['columns']
+    count = state['count']
+    mean = np.asarray(state['mean'])
+    std = np.sqrt(np.asarray(state['m2']) / (count - 1)) if count > 1 else np.full(len(columns), np.nan)
+
+    annual_returns = pd.Series(mean * TRADING_DAYS, index=columns)
+    annual_volatility = pd.Series(std * np.sqrt(TRADING_DAYS), index=columns)
+    return pd.DataFrame({
+        '指数': [INDEX_NAMES.get(column, column) for column in columns],
+        '年化收益率': annual_returns,
+        '年化波动率': annual_volatility,
+        'Sharpe Ratio': (annual_returns - risk_free_rate) / annual_volatility
+    })
+
+
+# 读取 CSV 的最新数据并增量更新统计状态，返回指标表（同 compute_metrics）
+# 状态与价格存储不一致（存储因 CSV 的历史数据被修改而重建、列变化）时从头重新计算
+def refresh_metrics(csv_path='STOXX.csv', risk_free_rate=RISK_FREE_RATE):
+    store_dir = store_path(csv_path)
+    sync_csv(csv_path, store_dir)
+    build = store_build(store_dir)
+    state = load_state(store_dir)
+
+    new_prices = None
+    if state is not None and state.get('build') == build and state['last_date'] is not None:
+        prices = load_prices(store_dir, start=state['last_date'])
+        if _continues(state, prices):
+            new_prices = prices.iloc[1:]
+    if new_prices is None:
+        prices = load_prices(store_dir)
+        state, new_prices = empty_state(prices.columns, build), prices
+
+    if not new_prices.empty:
+        state = update_state(state, new_prices)
+        save_state(store_dir, state)
+    return metrics_from_state(state, risk_free_rate)
+
+
+# 存储中 last_date 这一行是否仍是状态记录的那一行（日期、列和价格都相同）
+def _continues(state, prices):
+    if list(prices.columns) != state['columns'] or prices.empty:
+        return False
+    if prices.index[0] != pd.Timestamp(state['last_date']):
+        return False
+    return np.array_equal(prices.iloc[0].to_numpy(dtype=np.float64), np.asarray(state['last_prices']),
+                          equal_nan=True)
+
+
+def load_state(store_dir):
+    path = os.path.join(store_dir, STATE_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+# 先写临时文件再替换，中途失败时保留上一次的状态
+def save_state(store_dir, state):
+    write_sidecar_json(os.path.join(store_dir, STATE_FILE), state)
+
+
+if __name__ == '__main__':
+    # 校验增量结果与全量计算（compute_metrics）一致，并对比每日刷新的耗时
+    # python incremental_stats.py [价格 CSV]
+    import sys
+
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else 'STOXX.csv'
+    prices = pd.read_csv(csv_path, parse_dates=['Date'], index_col='Date')
+    expected = compute_metrics(prices)
+
+    # 一次处理全部历史
+    state = update_state(empty_state(prices.columns), prices)
+    pd.testing.assert_frame_equal(metrics_from_state(state), expected, rtol=1e-10)
+
+    # 先处理一半，之后逐日追加
+    half = len(prices) // 2
+    state = update_state(empty_state(prices.columns), prices.iloc[:half])
+    start = time.perf_counter()
+    for i in range(half, len(prices)):
+        state = update_state(state, prices.iloc[i:i + 1])
+    daily_ms = (time.perf_counter() - start) * 1000 / (len(prices) - half)
+    pd.testing.assert_frame_equal(metrics_from_state(state), expected, rtol=1e-10)
+
+    # 经由价格存储和持久化状态刷新，第二次调用时没有新数据
+    pd.testing.assert_frame_equal(refresh_metrics(csv_path), expected, rtol=1e-10)
+    start = time.perf_counter()
+    refreshed = refresh_metrics(csv_path)
+    refresh_ms = (time.perf_counter() - start) * 1000
+    pd.testing.assert_frame_equal(refreshed, expected, rtol=1e-10)
+
+    start = time.perf_counter()
+    compute_metrics(prices)
+    batch_ms = (time.perf_counter() - start) * 1000
+
+    print(f"增量结果与全量计算一致（{len(prices)} 行 × {prices.shape[1]} 列）")
+    print(f"  {'全量计算':<16} {batch_ms:>8.3f} ms")
+    print(f"  {'每追加一天':<15} {daily_ms:>8.3f} ms")
+    print(f"  {'refresh_metrics（无新数据）':<10} {refresh_ms:>8.3f} ms")
@@ -1,27 +1,41 @@
+from headless import finish_figure
 import pandas as pd # 导入pandas库并简写为pd
 import matplotlib.pyplot as plt  # 导入matplotlib.pyplot模块并简写为plt
-import seaborn as sns  # 导入seaborn库并简写为sns
+import argparse
+from bootstrap import bootstrap_intervals, error_bars  # 自助法置信区间及对应的误差线长度
+from chart_styles import cycle_colors  # 按类别数量分配调色板颜色
+from stoxx_metrics import load_prices
 
+# python mean_bar_w_error_bars.py                    示例数据，误差线为给定的标准差
+# python mean_bar_w_error_bars.py --file STOXX.csv   各指数的年化收益率，误差线为自助法 95% 置信区间
+parser = argparse.ArgumentParser(description='带误差线的均值柱状图')
+parser.add_argument('--file', default=None, help='价格数据 CSV 文件，不指定时使用示例数据')
+args = parser.parse_args()
 
-# 创建创建一个包含类别、值和标准差的DataFrame数据集
-data = pd.DataFrame({'category': ["A", "B", "C", "D", "E"],                     
-                     'value': [10, 15, 7, 12, 8], 'std': [1, 2, 1.5, 1.2, 2.5]})
-# 计算每个类别的均值和标准差
-mean_values = data['value']
-std_values = data['std']
-colors = sns.color_palette("Set1", n_colors=len(data))  # 创建颜色调色板# 创建均值柱状图
+if args.file:
+    intervals = bootstrap_intervals(load_prices(args.file).pct_change().dropna())
+    data = pd.DataFrame({'category': intervals['指数'], 'value': intervals['年化收益率']})
+    mean_values = data['value']
+    error_values = error_bars(intervals)  # 非对称误差线：[点估计 - 下限, 上限 - 点估计]
+else:
+    # 创建创建一个包含类别、值和标准差的DataFrame数据集
+    data = pd.DataFrame({'category': ["A", "B", "C", "D", "E"],
+                         'value': [10, 15, 7, 12, 8], 'std': [1, 2, 1.5, 1.2, 2.5]})
+    # 计算每个类别的均值和标准差
+    mean_values = data['value']
+    error_values = data['std']
+colors = cycle_colors(len(data), plt.get_cmap('Set1').colors)  # 创建颜色调色板（与 seaborn 的 "Set1" 相同，无需导入 seaborn）# 创建均值柱状图
 plt.figure(figsize=(6, 4))  # 创建图形对象，并设置图形大小
 bars = plt.bar(data['category'], mean_values, color=colors)# 绘制柱状图，指定x轴为类别，y轴为均值，柱状颜色为颜色调色板中的颜色
-# 添加误差线
-for i, (bar, std) in enumerate(zip(bars, std_values)):    
-    plt.errorbar(bar.get_x() + bar.get_width() / 2, bar.get_height(),                 
-                 # 在柱状图的中心位置添加误差线                 
-                yerr=std, fmt='none', color='black', ecolor='gray',                 # 设置误差线的样式和颜色
-                capsize=5, capthick=2)  # 设置误差线的帽子大小和线宽# 添加标题和标签
+# 添加误差线（对称的标准差或非对称的置信区间），一次画出所有柱子的误差线
+plt.errorbar([bar.get_x() + bar.get_width() / 2 for bar in bars], [bar.get_height() for bar in bars],
+             # 在柱状图的中心位置添加误差线
+             yerr=error_values, fmt='none', color='black', ecolor='gray',  # 设置误差线的样式和颜色
+             capsize=5, capthick=2)  # 设置误差线的帽子大小和线宽# 添加标题和标签
 plt.xlabel('Category')  # 设置x轴标签
 plt.ylabel('Mean Value')  # 设置y轴标签
 plt.title('Mean Bar Chart with Error Bars')  # 设置图表标题
 # 设置网格线的样式、颜色和透明度
 plt.grid(axis='both', linestyle='-', color='gray', alpha=0.5)
-plt.show()
+finish_figure(headless_path='mean_bar_w_error_bars.png', bbox_inches='tight')
 
@@ -0,0 +1,298 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from excel_cache import source_signature, write_sidecar_json
+
+# 跨进程的文件锁只在有 fcntl 的系统上可用，其他系统只在进程内互斥
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# 价格时间序列的列式内存映射存储：
+#   dates.i8        按时间升序排列的日期（datetime64[ns] 的 int64 值）
+#   c00000.f8, ...  每个序列一个 float64 文件，行与 dates.i8 一一对应
+#   meta.json       列名、行数、来源 CSV 的签名和本次构建的编号（每次重建存储时更新）
+# 按日期区间读取时先在日期文件上二分查找（O(log n)），只复制区间内、所需列的数据；
+# 新的交易日以追加方式写入各文件末尾，已有数据不改写
+# 写入（同步、重建、追加）持有存储的排他锁，读取持有共享锁：看板的后台刷新线程、
+# 页面请求和多个 WSGI 工作进程同时访问同一存储时，读取方不会看到重建到一半的数据文件
+STORE_DIR = '.price_store'
+LOCK_FILE = '.lock'
+
+_thread_locks = {}
+_thread_locks_lock = threading.Lock()
+
+
+# 读取 CSV 对应的价格数据，优先使用内存映射存储
+# CSV 未变化时不再解析；CSV 只在末尾增加了新的交易日时只追加新行，历史数据有改动时重建存储
+def load_prices_cached(csv_path, start=None, end=None, columns=None, store_dir=None):
+    store_dir = store_dir or store_path(csv_path)
+    sync_csv(csv_path, store_dir)
+    return load_prices(store_dir, start, end, columns)
+
+
+# CSV 对应的存储目录：文件名加绝对路径的哈希，例如 STOXX.csv -> .price_store/STOXX.1a2b3c4d5e6f7a8b，
+# 不同目录下的同名 CSV 各自使用独立的存储
+def store_path(csv_path):
+    digest = hashlib.sha256(os.path.abspath(csv_path).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(STORE_DIR, f"{os.path.splitext(os.path.basename(csv_path))[0]}.{digest}")
+
+
+# 使存储与 CSV 一致，返回新写入的行数
+# 存储已与 CSV 一致时不加锁直接返回；否则在排他锁内重新检查，其他进程刚同步过时不重复解析 CSV
+def sync_csv(csv_path, store_dir):
+    source = source_signature(csv_path)
+    meta = _read_meta(store_dir)
+    if meta is not None and meta.get('source') == source:
+        return 0
+
+    with store_lock(store_dir):
+        meta = _read_meta(store_dir)
+        if meta is not None and meta.get('source') == source:
+            return 0
+        frame = pd.read_csv(csv_path, parse_dates=['Date'], index_col='Date').sort_index()
+        if meta is not None and list(frame.columns) == meta['columns'] and _is_prefix(store_dir, meta, frame):
+            added = _append_prices(store_dir, frame.iloc[meta['rows']:])
+        else:
+            _build_store(frame, store_dir)
+            added = len(frame)
+
+        meta = _read_meta(store_dir)
+        meta['source'] = source
+        _write_meta(store_dir, meta)
+    return added
+
+
+# 用 DataFrame（日期索引、每列一个序列）新建存储，覆盖已有的存储
+def build_store(frame, store_dir):
+    with store_lock(store_dir):
+        return _build_store(frame, store_dir)
+
+
+# 在存储末尾追加新的交易日，列必须与存储一致，日期必须晚于已有的最后一天；返回追加的行数
+# 先写数据文件、最后更新 meta.json 中的行数，中途失败时多写的部分会在下次追加前截掉
+def append_prices(store_dir, frame):
+    with store_lock(store_dir):
+        return _append_prices(store_dir, frame)
+
+
+# 存储的锁：shared=False 为排他锁（写入），shared=True 为共享锁（读取）
+# 锁文件在存储目录中，用 flock 在进程之间互斥；同一进程的不同线程各自打开锁文件，同样互斥
+# name 为锁文件名，存储目录中其他派生文件的生成（例如看板内容）可以使用单独的锁，不阻塞价格的读取
+# 没有 fcntl 时退回进程内的可重入锁（每个锁文件一个），读写都互斥
+@contextmanager
+def store_lock(store_dir, shared=False, name=LOCK_FILE):
+    path = os.path.join(store_dir, name)
+    if fcntl is None:
+        with _thread_locks_lock:
+            lock = _thread_locks.setdefault(os.path.abspath(path), threading.RLock())
+        with lock:
+            yield
+        return
+    os.makedirs(store_dir, exist_ok=True)
+    with open(path, 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _build_store(frame, store_dir):
+    os.makedirs(store_dir, exist_ok=True)
+    meta = {'columns': [str(column) for column in frame.columns], 'rows': 0, 'build': time.time_ns()}
+    for path in [_dates_path(store_dir)] + [_column_path(store_dir, i) for i in range(frame.shape[1])]:
+        open(path, 'wb').close()
+    _write_meta(store_dir, meta)
+    return _append_prices(store_dir, frame)
+
+
+def _append_prices(store_dir, frame):
+    meta = _read_meta(store_dir)
+    if meta is None:
+        raise FileNotFoundError(f"价格存储不存在: {store_dir}")
+    if [str(column) for column in frame.columns] != meta['columns']:
+        raise ValueError(f"列与存储不一致: {list(frame.columns)} != {meta['columns']}")
+    if frame.empty:
+        return 0
+
+    dates = pd.DatetimeIndex(frame.index).as_unit('ns').asi8
+    if not np.all(np.diff(dates) > 0):
+        raise ValueError("追加的日期必须严格递增")
+    if meta['rows'] and dates[0] <= _open_dates(store_dir, meta)[-1]:
+        raise ValueError("追加的日期必须晚于存储中的最后一天")
+
+    _truncate(_dates_path(store_dir), meta['rows'] * 8)
+    with open(_dates_path(store_dir), 'ab') as f:
+        dates.astype(np.int64).tofile(f)
+    values = frame.to_numpy(dtype=np.float64)
+    for i in range(values.shape[1]):
+        _truncate(_column_path(store_dir, i), meta['rows'] * 8)
+        with open(_column_path(store_dir, i), 'ab') as f:
+            np.ascontiguousarray(values[:, i]).tofile(f)
+
+    meta['rows'] += len(frame)
+    _write_meta(store_dir, meta)
+    return len(frame)
+
+
+# 按日期区间 [start, end] 和列名读取，返回以 Date 为索引的 DataFrame
+# 只有区间内、所需列的数据会从内存映射中复制出来；复制在共享锁内完成，不会与重建交错
+def load_prices(store_dir, start=None, end=None, columns=None):
+    if not os.path.isdir(store_dir):
+        raise FileNotFoundError(f"价格存储不存在: {store_dir}")
+    with store_lock(store_dir, shared=True):
+        meta = _read_meta(store_dir)
+        if meta is None:
+            raise FileNotFoundError(f"价格存储不存在: {store_dir}")
+        columns = meta['columns'] if columns is None else list(columns)
+        positions = [meta['columns'].index(column) for column in columns]
+
+        dates = _open_dates(store_dir, meta)
+        lo, hi = date_range(dates, start, end)
+        values = np.empty((hi - lo, len(positions)), dtype=np.float64)
+        for k, i in enumerate(positions):
+            values[:, k] = _open_column(store_dir, meta, i)[lo:hi]
+        index = pd.DatetimeIndex(np.array(dates[lo:hi]).view('datetime64[ns]'), name='Date')
+    return pd.DataFrame(values, index=index, columns=columns)
+
+
+# 存储的构建编号：只追加新行时不变，重建（历史数据被修改）后改变；存储不存在时为 None
+# 基于存储内容保存的派生状态（例如 incremental_stats 的累计统计）用它判断是否仍然有效
+def store_build(store_dir):
+    meta = _read_meta(store_dir)
+    return None if meta is None else meta.get('build')
+
+
+# 存储当前内容的版本 (构建编号, 行数)：追加或重建后都会改变；存储不存在时为 None
+# 只读取存储、不同步 CSV 的调用方（例如看板的折线图）用它作为缓存键
+def store_version(store_dir):
+    meta = _read_meta(store_dir)
+    return None if meta is None else (meta.get('build'), meta['rows'])
+
+
+# 日期区间 [start, end] 在已排序日期数组中对应的行号范围 [lo, hi)，二分查找
+def date_range(dates, start=None, end=None):
+    lo = 0 if start is None else int(np.searchsorted(dates, pd.Timestamp(start).as_unit('ns').value, side='left'))
+    hi = len(dates) if end is None else int(np.searchsorted(dates, pd.Timestamp(end).as_unit('ns').value, side='right'))
+    return lo, max(lo, hi)
+
+
+def _open_dates(store_dir, meta):
+    if meta['rows'] == 0:
+        return np.zeros(0, dtype=np.int64)
+    return np.memmap(_dates_path(store_dir), dtype=np.int64, mode='r', shape=(meta['rows'],))
+
+
+def _open_column(store_dir, meta, i):
+    if meta['rows'] == 0:
+        return np.zeros(0, dtype=np.float64)
+    return np.memmap(_column_path(store_dir, i), dtype=np.float64, mode='r', shape=(meta['rows'],))
+
+
+# CSV 的前 rows 行是否与存储完全相同（日期和所有值），相同时只需追加其余的行
+def _is_prefix(store_dir, meta, frame):
+    rows = meta['rows']
+    if rows == 0:
+        return True
+    if len(frame) < rows:
+        return False
+    dates = pd.DatetimeIndex(frame.index[:rows]).as_unit('ns').asi8
+    if not np.array_equal(dates, _open_dates(store_dir, meta)):
+        return False
+    values = frame.iloc[:rows].to_numpy(dtype=np.float64)
+    return all(np.array_equal(_open_column(store_dir, meta, i), values[:, i], equal_nan=True)
+               for i in range(values.shape[1]))
+
+
+def _truncate(path, size):
+    if os.path.getsize(path) > size:
+        with open(path, 'r+b') as f:
+            f.truncate(size)
+
+
+def _dates_path(store_dir):
+    return os.path.join(store_dir, 'dates.i8')
+
+
+def _column_path(store_dir, i):
+    return os.path.join(store_dir, f'c{i:05d}.f8')
+
+
+def _read_meta(store_dir):
+    path = os.path.join(store_dir, 'meta.json')
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+# 先写临时文件再替换，读取方不会看到写了一半的 meta.json
+def _write_meta(store_dir, meta):
+    write_sidecar_json(os.path.join(store_dir, 'meta.json'), meta)
+
+
+# 生成合成价格面板（工作日、几何随机游走），用于基准测试
+def synthetic_prices(columns, years, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range('2000-01-03', periods=years * 261, name='Date')
+    returns = rng.normal(0.0003, 0.01, size=(len(dates), columns))
+    return pd.DataFrame(100 * np.exp(np.cumsum(returns, axis=0)), index=dates,
+                        columns=[f'S{i:05d}' for i in range(columns)])
+
+
+# 对比每次解析 CSV 与读取内存映射存储的耗时，并校验结果一致
+def benchmark(csv_path, repeat=3):
+    def best(func):
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = func()
+            times.append(time.perf_counter() - start)
+        return min(times) * 1000, result
+
+    csv_ms, expected = best(lambda: pd.read_csv(csv_path, parse_dates=['Date'], index_col='Date'))
+    start = time.perf_counter()
+    sync_csv(csv_path, store_path(csv_path))
+    sync_ms = (time.perf_counter() - start) * 1000
+    store_ms, cached = best(lambda: load_prices_cached(csv_path))
+    pd.testing.assert_frame_equal(cached, expected, check_freq=False, check_index_type=False)
+
+    # 只取最近一年、前 10 列
+    recent_start = expected.index[-1] - pd.DateOffset(years=1)
+    slice_ms, recent = best(lambda: load_prices_cached(csv_path, start=recent_start, columns=expected.columns[:10]))
+    pd.testing.assert_frame_equal(recent, expected.loc[recent_start:, expected.columns[:10]],
+                                  check_freq=False, check_index_type=False)
+
+    print(f"{csv_path}: {expected.shape[0]} 行 × {expected.shape[1]} 列")
+    print(f"  {'read_csv':<24} {csv_ms:>10.2f} ms")
+    print(f"  {'首次建立存储':<20} {sync_ms:>10.2f} ms")
+    print(f"  {'内存映射存储（全部）':<16} {store_ms:>10.2f} ms")
+    print(f"  {'最近一年、前 10 列':<18} {slice_ms:>10.2f} ms  ({recent.shape[0]} × {recent.shape[1]})")
+
+
+if __name__ == '__main__':
+    # python price_store.py                              对 STOXX.csv 做基准测试
+    # python price_store.py --synthetic 500 --years 20   同时对合成的宽面板做基准测试
+    import argparse
+
+    parser = argparse.ArgumentParser(description='价格 CSV 与内存映射存储的读取耗时对比')
+    parser.add_argument('--file', default='STOXX.csv', help='价格数据 CSV 文件')
+    parser.add_argument('--synthetic', type=int, default=0, help='合成面板的序列数，0 表示不测试')
+    parser.add_argument('--years', type=int, default=20, help='合成面板的年数')
+    args = parser.parse_args()
+
+    benchmark(args.file)
+    if args.synthetic:
+        synthetic_path = f'synthetic_prices_{args.synthetic}x{args.years}.csv'
+        if not os.path.exists(synthetic_path):
+            synthetic_prices(args.synthetic, args.years).to_csv(synthetic_path)
+        benchmark(synthetic_path)
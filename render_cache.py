@@ -0,0 +1,58 @@
+import hashlib
+import json
+import os
+import shutil
+
+import pandas as pd
+
+# 渲染结果缓存目录，文件名为内容哈希
+CACHE_DIR = '.render_cache'
+
+
+# 计算渲染缓存键：汇总后的数据、图表参数（颜色、分组、字体、dpi 等）、matplotlib 的版本和全局设置
+# 以及相关代码文件的内容共同决定一张图
+# matplotlib 在函数内导入，只导入本模块的任务（例如只检查缓存）不必加载它
+def render_key(data, params, code_files=()):
+    import matplotlib
+
+    digest = hashlib.sha256()
+
+    # 汇总后的数据：列名加逐行哈希，行顺序也会影响结果
+    digest.update(json.dumps([str(column) for column in data.columns]).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(data, index=False).values.tobytes())
+
+    # 图表参数
+    digest.update(json.dumps(params, sort_keys=True, default=str, ensure_ascii=False).encode('utf-8'))
+
+    # matplotlib 版本和当前的 rcParams（字体、dpi、样式等全局设置同样影响输出）；
+    # backend 不影响保存的图片，且读取它会触发后端的自动选择，故不计入
+    digest.update(matplotlib.__version__.encode('utf-8'))
+    rc_params = [(name, str(matplotlib.rcParams[name])) for name in sorted(matplotlib.rcParams) if name != 'backend']
+    digest.update(json.dumps(rc_params, ensure_ascii=False).encode('utf-8'))
+
+    # 代码版本：脚本及其依赖模块的源码
+    for path in code_files:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+
+    return digest.hexdigest()
+
+
+# 带缓存的渲染：命中时直接把缓存的图片复制到 output_path，跳过布局和绘制；
+# 未命中时调用 render(output_path) 生成图片并存入缓存。返回是否命中缓存
+def cached_render(output_path, data, params, render, code_files=()):
+    key = render_key(data, params, code_files)
+    cache_path = os.path.join(CACHE_DIR, key + os.path.splitext(output_path)[1])
+
+    if os.path.exists(cache_path):
+        shutil.copyfile(cache_path, output_path)
+        print(f"渲染缓存命中，复用 {cache_path}")
+        return True
+
+    render(output_path)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    # 先写临时文件再重命名，避免并发任务读到写了一半的缓存
+    temp_path = f"{cache_path}.{os.getpid()}.tmp"
+    shutil.copyfile(output_path, temp_path)
+    os.replace(temp_path, cache_path)
+    return False
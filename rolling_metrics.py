@@ -0,0 +1,191 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from stoxx_metrics import RISK_FREE_RATE, TRADING_DAYS
+
+# 滚动窗口风险指标：对价格面板中的每个序列、每个窗口计算
+#   return        年化收益率（窗口内日收益率均值 × 252，与 compute_metrics 相同）
+#   volatility    年化波动率（窗口内日收益率标准差 × sqrt(252)）
+#   sharpe        Sharpe Ratio
+#   max_drawdown  窗口内的最大回撤（负数，如 -0.12 表示 12%）
+#   beta          相对基准序列的 beta
+# 收益率的和、平方和、与基准的乘积和各做一次累加，所有窗口和序列都由累加值相减得到，
+# 不对每列调用 .rolling().apply；最大回撤按窗口长度分块，用块内的累计最大 / 最小值计算
+WINDOWS = (63, 126, 252)
+METRICS = ('return', 'volatility', 'sharpe', 'max_drawdown', 'beta')
+
+# 计算滚动指标，返回 {(指标, 窗口): DataFrame（日期 × 序列）}
+# 结果的日期为收益率的日期（价格的第二天起），窗口内有缺失收益率时为 NaN（与 rolling 默认的 min_periods 相同）
+# benchmark 为基准列名，默认第一列；dtype 为结果的数据类型，面板很大时可用 float32 减半内存
+def rolling_metrics(prices, windows=WINDOWS, benchmark=None, risk_free_rate=RISK_FREE_RATE, dtype=np.float64):
+    benchmark = prices.columns[0] if benchmark is None else benchmark
+    values = prices.to_numpy(dtype=np.float64)
+    returns = values[1:] / values[:-1] - 1
+    bench = returns[:, prices.columns.get_loc(benchmark)]
+
+    # 缺失的收益率按 0 累加，另外累加有效个数，窗口内个数不足时结果为 NaN
+    valid = ~np.isnan(returns)
+    filled = np.where(valid, returns, 0.0)
+    bench_valid = ~np.isnan(bench)
+    bench_filled = np.where(bench_valid, bench, 0.0)
+    sums = {
+        'count': _padded_cumsum(valid.astype(np.int64)),
+        'x': _padded_cumsum(filled),
+        'xx': _padded_cumsum(filled * filled),
+        'xb': _padded_cumsum(filled * bench_filled[:, None]),
+    }
+    bench_sums = {
+        'count': _padded_cumsum(bench_valid.astype(np.int64)),
+        'b': _padded_cumsum(bench_filled),
+        'bb': _padded_cumsum(bench_filled * bench_filled),
+    }
+
+    index, columns = prices.index[1:], prices.columns
+    results = {}
+    for window in windows:
+        window_sums = {name: _window_sum(total, window) for name, total in sums.items()}
+        bench_window = {name: _window_sum(total, window) for name, total in bench_sums.items()}
+        complete = window_sums['count'] == window
+        bench_complete = (bench_window['count'] == window)[:, None]
+
+        mean = window_sums['x'] / window
+        variance = (window_sums['xx'] - window_sums['x'] * mean) / (window - 1)
+        bench_mean = bench_window['b'] / window
+        bench_variance = (bench_window['bb'] - bench_window['b'] * bench_mean) / (window - 1)
+        covariance = (window_sums['xb'] - window_sums['x'] * bench_mean[:, None]) / (window - 1)
+
+        annual_return = mean * TRADING_DAYS
+        volatility = np.sqrt(np.maximum(variance, 0.0)) * np.sqrt(TRADING_DAYS)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sharpe = (annual_return - risk_free_rate) / volatility
+            beta = covariance / bench_variance[:, None]
+
+        window_results = {
+            'return': np.where(complete, annual_return, np.nan),
+            'volatility': np.where(complete, volatility, np.nan),
+            'sharpe': np.where(complete, sharpe, np.nan),
+            'max_drawdown': rolling_max_drawdown(values, window),
+            'beta': np.where(complete & bench_complete, beta, np.nan),
+        }
+        for metric in METRICS:
+            results[(metric, window)] = pd.DataFrame(_pad_front(window_results[metric], len(index), dtype),
+                                                     index=index, columns=columns)
+    return results
+
+
+# 每个窗口（window 个收益率，对应 window + 1 个价格）内的最大回撤，返回 (窗口数, 序列数)
+# 把时间轴按窗口长度 L 切成块，任一窗口都由某块的后缀和下一块的前缀组成，
+# 窗口的最大回撤 = min(后缀内的最大回撤, 前缀内的最大回撤, 前缀最低价 / 后缀最高价 - 1)，
+# 块内的前缀 / 后缀量都是累计最大 / 最小值，整体 O(天数 × 序列数)，与窗口长度无关
+def rolling_max_drawdown(values, window):
+    span = window + 1
+    n, m = values.shape
+    n_windows = max(n - span + 1, 0)
+    if n_windows == 0:
+        return np.empty((0, m))
+
+    # 末尾补 NaN 到整块，补齐的部分只会出现在不完整的窗口中
+    blocks = -(-n // span)
+    padded = np.full((blocks * span, m), np.nan)
+    padded[:n] = values
+    padded = padded.reshape(blocks, span, m)
+
+    # 后缀：从 s 到块末尾；以 s 为峰值的最大跌幅为 后缀最低价 / P[s] - 1
+    reverse = padded[:, ::-1]
+    suffix_max = np.maximum.accumulate(reverse, axis=1)[:, ::-1].reshape(-1, m)
+    suffix_min = np.minimum.accumulate(reverse, axis=1)[:, ::-1]
+    suffix_drawdown = np.minimum.accumulate((suffix_min / padded - 1)[:, ::-1], axis=1)[:, ::-1].reshape(-1, m)
+
+    # 前缀：从块开头到 e
+    prefix_min = np.minimum.accumulate(padded, axis=1).reshape(-1, m)
+    prefix_drawdown = np.minimum.accumulate(padded / np.maximum.accumulate(padded, axis=1) - 1,
+                                            axis=1).reshape(-1, m)
+
+    starts = np.arange(n_windows)
+    ends = starts + span - 1
+    result = np.minimum(np.minimum(suffix_drawdown[starts], prefix_drawdown[ends]),
+                        prefix_min[ends] / suffix_max[starts] - 1)
+    # 窗口恰好是一整块时没有前缀部分
+    aligned = starts % span == 0
+    result[aligned] = suffix_drawdown[starts[aligned]]
+    return result
+
+
+# 前面补一行 0 的累加和，窗口 [i, i + w) 的和为 total[i + w] - total[i]
+def _padded_cumsum(values):
+    total = np.zeros((values.shape[0] + 1,) + values.shape[1:], dtype=values.dtype)
+    np.cumsum(values, axis=0, out=total[1:])
+    return total
+
+
+# 每个完整窗口的和，第 k 行对应以第 k + window - 1 个元素结尾的窗口
+def _window_sum(total, window):
+    return total[window:] - total[:-window]
+
+
+# 在前面补 NaN 到 rows 行，使结果与收益率的日期对齐；历史比窗口短时没有完整窗口，结果全为 NaN
+def _pad_front(values, rows, dtype):
+    result = np.full((rows,) + values.shape[1:], np.nan, dtype=dtype)
+    result[rows - values.shape[0]:] = values
+    return result
+
+
+# 与 rolling_metrics 定义相同、逐列调用 pandas rolling 的参考实现，用于校验和基准测试
+def rolling_metrics_pandas(prices, windows=WINDOWS, benchmark=None, risk_free_rate=RISK_FREE_RATE):
+    benchmark = prices.columns[0] if benchmark is None else benchmark
+    returns = prices.pct_change(fill_method=None).iloc[1:]
+    results = {}
+    for window in windows:
+        frames = {metric: {} for metric in METRICS}
+        for column in prices.columns:
+            rolling = returns[column].rolling(window)
+            annual_return = rolling.mean() * TRADING_DAYS
+            volatility = rolling.std() * np.sqrt(TRADING_DAYS)
+            frames['return'][column] = annual_return
+            frames['volatility'][column] = volatility
+            frames['sharpe'][column] = (annual_return - risk_free_rate) / volatility
+            frames['beta'][column] = rolling.cov(returns[benchmark]) / returns[benchmark].rolling(window).var()
+            frames['max_drawdown'][column] = prices[column].rolling(window + 1).apply(
+                lambda p: (p / np.maximum.accumulate(p)).min() - 1, raw=True).iloc[1:]
+        for metric in METRICS:
+            results[(metric, window)] = pd.DataFrame(frames[metric])
+    return results
+
+
+if __name__ == '__main__':
+    # 在 STOXX.csv 上与 pandas rolling 的结果校验，再在合成的 2000 序列 × 20 年面板上测试耗时
+    # python rolling_metrics.py [--series 2000] [--years 20] [--reference-series 20]
+    import argparse
+
+    from price_store import synthetic_prices
+    from stoxx_metrics import load_prices
+
+    parser = argparse.ArgumentParser(description='滚动窗口风险指标的校验和基准测试')
+    parser.add_argument('--series', type=int, default=2000, help='合成面板的序列数')
+    parser.add_argument('--years', type=int, default=20, help='合成面板的年数')
+    parser.add_argument('--reference-series', type=int, default=20,
+                        help='pandas 参考实现计时所用的序列数，耗时按序列数线性外推')
+    args = parser.parse_args()
+
+    prices = load_prices()
+    fast = rolling_metrics(prices)
+    reference = rolling_metrics_pandas(prices)
+    for key, frame in reference.items():
+        pd.testing.assert_frame_equal(fast[key], frame, rtol=1e-8, check_freq=False, check_names=False)
+    print(f"STOXX.csv: 与 pandas rolling 一致（{len(WINDOWS)} 个窗口 × {len(METRICS)} 个指标）")
+
+    panel = synthetic_prices(args.series, args.years)
+    start = time.perf_counter()
+    rolling_metrics(panel, dtype=np.float32)
+    fast_s = time.perf_counter() - start
+
+    subset = panel.iloc[:, :args.reference_series]
+    start = time.perf_counter()
+    rolling_metrics_pandas(subset)
+    reference_s = (time.perf_counter() - start) * args.series / subset.shape[1]
+
+    print(f"合成面板 {panel.shape[0]} 天 × {panel.shape[1]} 个序列:")
+    print(f"  {'rolling_metrics':<26} {fast_s:>8.2f} s")
+    print(f"  {'逐列 pandas rolling（外推）':<20} {reference_s:>8.2f} s")
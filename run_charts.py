@@ -0,0 +1,153 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# 批量任务一律使用无界面的 Agg 后端，必须在导入 pyplot 之前设置
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+# 设置中文字体支持，与各图表脚本一致
+plt.rcParams['font.sans-serif'] = ['Microsoft YaHei', 'SimHei', 'SimSun', 'Arial Unicode MS']
+plt.rcParams['axes.unicode_minus'] = False
+plt.rcParams['font.size'] = 16
+
+import bubble_chart
+import bubble_layout
+from bubble_chart import add_bubble_styles, country_weights_from_data, draw_bubble_chart
+from bubble_layout import improved_layout
+from chart_styles import cycle_colors
+from excel_export import export_weights
+from holdings_schema import ROLE_COLUMNS, read_holdings
+from render_cache import cached_render
+from weight_aggregation import aggregate_weights
+
+# 饼图默认配色，与 geo.py 一致
+PIE_COLORS = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22',
+              '#17becf', '#d3d3d3']
+
+
+# 行业（或其他维度）权重饼图任务，对应 geo.py / geo_STOXX600.py
+# data 为输入工作簿中至少包含 job_roles(job) 各列的数据
+def run_pie_job(job, data):
+    # dimension 为 holdings_schema 中的列角色，例如 'industry'
+    dimension, weight_column = ROLE_COLUMNS[job['dimension']], ROLE_COLUMNS['weight']
+    table = aggregate_weights(data, [dimension], weight_column, top_n=job.get('top_n', 10))[dimension]
+
+    params = {'title': job['title'], 'colors': job.get('colors', PIE_COLORS), 'figsize': (8, 8), 'startangle': 140}
+
+    def render(path):
+        fig = plt.figure(figsize=params['figsize'])
+        plt.pie(table[weight_column], labels=table[dimension], autopct='%1.1f%%', startangle=params['startangle'],
+                colors=cycle_colors(len(table), params['colors']))
+        plt.title(params['title'])
+        fig.savefig(path, bbox_inches='tight')
+        plt.close(fig)
+
+    cached_render(job['image'], table, params, render, code_files=[__file__])
+    _export(job, table, 'pie', dimension, weight_column)
+
+
+# 国家权重气泡图任务，对应 geo_bubbles.py / geo_US.py
+def run_bubble_job(job, data):
+    country_weights, _, weight_column = country_weights_from_data(data, verbose=False)
+    country_weights = add_bubble_styles(country_weights, weight_column)
+    params = {'title': job['title'], 'layout': job.get('layout', 'force'), 'figsize': (16, 14), 'dpi': job.get('dpi', 300)}
+
+    def render(path):
+        positions = improved_layout(country_weights['radius'].values, layout=params['layout'])
+        fig, ax = plt.subplots(figsize=params['figsize'])
+        draw_bubble_chart(ax, country_weights, positions, weight_column, params['title'])
+        fig.tight_layout()
+        fig.savefig(path, dpi=params['dpi'], bbox_inches='tight')
+        plt.close(fig)
+
+    cached_render(job['image'], country_weights, params, render,
+                  code_files=[__file__, bubble_chart.__file__, bubble_layout.__file__])
+    _export(job, country_weights, 'bubble', '国家', weight_column, layout=params['layout'])
+
+
+# layout 为气泡图 PNG 使用的布局算法，原生气泡图按同一算法布局
+def _export(job, table, chart_type, label_column, value_column, layout='force'):
+    if not job.get('excel'):
+        return
+    native = job.get('excel_chart', 'image') == 'native'
+    export_weights(table, job['excel'], job.get('sheet_title', 'Weights'), image_path=job['image'],
+                   native_chart=chart_type if native else None, label_column=label_column, value_column=value_column,
+                   layout=layout)
+
+
+JOB_TYPES = {
+    'pie': run_pie_job,
+    'bubble': run_bubble_job,
+}
+
+
+# 任务需要读取的列角色
+def job_roles(job):
+    if job['chart'] == 'pie':
+        return [job['dimension'], 'weight']
+    return ['country', 'weight']
+
+
+# 在工作进程中执行单个任务，返回 (任务名, 耗时, 错误信息)；单个任务失败不影响其他任务
+def run_job(job, data):
+    start = time.perf_counter()
+    try:
+        JOB_TYPES[job['chart']](job, data)
+        error = None
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    return job.get('name', job['image']), time.perf_counter() - start, error
+
+
+# 在同一个工作进程中依次执行同一输入文件的一组任务：工作簿只读取一次，读取各任务所需列的并集
+# 读取失败时组内所有任务都记为失败
+def run_job_group(jobs):
+    start = time.perf_counter()
+    roles = list(dict.fromkeys(role for job in jobs for role in job_roles(job)))
+    try:
+        data = read_holdings(jobs[0]['input'], roles)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        return [(job.get('name', job['image']), time.perf_counter() - start, error) for job in jobs]
+    return [run_job(job, data) for job in jobs]
+
+
+# 读取任务清单并用进程池并行执行；同一输入文件的任务合为一组交给同一个工作进程，不同输入文件的组并行
+def run_manifest(manifest_path, workers=None):
+    with open(manifest_path, encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    groups = {}
+    for job in manifest['jobs']:
+        job = dict(job)
+        for key in ('input', 'image', 'excel'):
+            if job.get(key):
+                job[key] = os.path.join(base_dir, job[key])
+        groups.setdefault(job['input'], []).append(job)
+
+    failures = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_job_group, jobs) for jobs in groups.values()]
+        for future in as_completed(futures):
+            for name, elapsed, error in future.result():
+                if error is None:
+                    print(f"完成 {name} ({elapsed:.2f}s)")
+                else:
+                    failures += 1
+                    print(f"失败 {name} ({elapsed:.2f}s): {error}")
+    return failures
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='按任务清单并行生成全部图表')
+    parser.add_argument('manifest', nargs='?', default='charts_manifest.json', help='任务清单 JSON 文件')
+    parser.add_argument('--workers', type=int, default=None, help='进程数，默认为 CPU 核数')
+    args = parser.parse_args()
+
+    failures = run_manifest(args.manifest, workers=args.workers)
+    raise SystemExit(1 if failures else 0)
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+
+from price_store import load_prices_cached
+
+# 只依赖 numpy / pandas：只需要指标表的任务不必加载 Dash、matplotlib 或 seaborn
+
+# 假设无风险利率为0.02（2%）
+RISK_FREE_RATE = 0.02
+TRADING_DAYS = 252
+
+# 指数代码对应的显示名称
+INDEX_NAMES = {
+    'SXXP Index': 'STOXX 600',
+    'SX5E Index': 'STOXX 50',
+    'MCXP Index': 'STOXX Mid 200',
+}
+
+
+# 读取价格数据，日期列作为索引
+# 经由 price_store 的内存映射存储读取：CSV 未变化时不再解析，可只取 [start, end] 区间和部分列
+def load_prices(file_path='STOXX.csv', start=None, end=None, columns=None):
+    return load_prices_cached(file_path, start, end, columns)
+
+
+# 计算每个指数的年化收益率、年化波动率和 Sharpe Ratio（数值形式，未格式化）
+def compute_metrics(prices, risk_free_rate=RISK_FREE_RATE):
+    # 计算每日收益率
+    returns = prices.pct_change().dropna()
+
+    annual_returns = returns.mean() * TRADING_DAYS
+    annual_volatility = returns.std() * np.sqrt(TRADING_DAYS)
+    sharpe_ratio = (annual_returns - risk_free_rate) / annual_volatility
+
+    return pd.DataFrame({
+        '指数': [INDEX_NAMES.get(column, column) for column in prices.columns],
+        '年化收益率': annual_returns,
+        '年化波动率': annual_volatility,
+        'Sharpe Ratio': sharpe_ratio
+    })
+
+
+# 格式化为展示用的表格：收益率和波动率为百分数，Sharpe Ratio 保留两位小数
+def format_results(metrics):
+    df_results = metrics.copy()
+    df_results['年化收益率'] = df_results['年化收益率'].apply(lambda x: f'{x:.2%}')
+    df_results['年化波动率'] = df_results['年化波动率'].apply(lambda x: f'{x:.2%}')
+    df_results['Sharpe Ratio'] = df_results['Sharpe Ratio'].apply(lambda x: round(x, 2))
+    return df_results
+
+
+if __name__ == '__main__':
+    print(format_results(compute_metrics(load_prices())).to_string(index=False))
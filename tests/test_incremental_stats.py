@@ -0,0 +1,84 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import incremental_stats
+from incremental_stats import empty_state, metrics_from_state, refresh_metrics, update_state
+from price_store import synthetic_prices
+from stoxx_metrics import compute_metrics
+
+
+# 合成价格面板，其中一个价格缺失（对应的两个收益率整行跳过，与 compute_metrics 的 dropna 一致）
+@pytest.fixture
+def prices():
+    frame = synthetic_prices(3, 2)
+    frame.iloc[100, 1] = np.nan
+    return frame
+
+
+# 记录每次 update_state 处理的行数，用来区分增量更新和从头重新计算
+@pytest.fixture
+def updates(monkeypatch):
+    calls = []
+
+    def recording_update_state(state, new_prices):
+        calls.append((state['count'], len(new_prices)))
+        return update_state(state, new_prices)
+
+    monkeypatch.setattr(incremental_stats, 'update_state', recording_update_state)
+    return calls
+
+
+# 写入 CSV，并确保修改时间变化（同一时间戳内的两次写入也会被 sync_csv 识别）
+def write_csv(frame, path):
+    previous = os.stat(path).st_mtime_ns if os.path.exists(path) else 0
+    frame.to_csv(path)
+    os.utime(path, ns=(previous + 10 ** 9, previous + 10 ** 9))
+
+
+def test_update_state_in_chunks_matches_full_recompute(prices):
+    state = empty_state(prices.columns)
+    for start in range(0, len(prices), 37):
+        state = update_state(state, prices.iloc[start:start + 37])
+    pd.testing.assert_frame_equal(metrics_from_state(state), compute_metrics(prices), rtol=1e-10)
+
+
+def test_refresh_with_appended_rows_matches_full_recompute(prices, updates, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    csv_path = 'prices.csv'
+    half = len(prices) // 2
+
+    write_csv(prices.iloc[:half], csv_path)
+    pd.testing.assert_frame_equal(refresh_metrics(csv_path), compute_metrics(prices.iloc[:half]), rtol=1e-10)
+
+    # 只处理新增的行，在已有状态上继续累加
+    write_csv(prices, csv_path)
+    pd.testing.assert_frame_equal(refresh_metrics(csv_path), compute_metrics(prices), rtol=1e-10)
+    assert updates[-1][0] > 0 and updates[-1][1] == len(prices) - half
+
+    # 没有新数据时不再更新状态
+    calls = len(updates)
+    pd.testing.assert_frame_equal(refresh_metrics(csv_path), compute_metrics(prices), rtol=1e-10)
+    assert len(updates) == calls
+
+
+def test_refresh_after_history_change_rebuilds(prices, updates, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    csv_path = 'prices.csv'
+    write_csv(prices, csv_path)
+    refresh_metrics(csv_path)
+
+    # 修改历史价格后状态失效，从头重新计算
+    revised = prices.copy()
+    revised.iloc[10, 0] *= 1.01
+    write_csv(revised, csv_path)
+    pd.testing.assert_frame_equal(refresh_metrics(csv_path), compute_metrics(revised), rtol=1e-10)
+    assert updates[-1] == (0, len(revised))
+
+    # 修改最后一天的价格（状态中保存的那一行）同样重新计算
+    revised.iloc[-1, 2] *= 0.99
+    write_csv(revised, csv_path)
+    pd.testing.assert_frame_equal(refresh_metrics(csv_path), compute_metrics(revised), rtol=1e-10)
+    assert updates[-1] == (0, len(revised))
@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from price_store import synthetic_prices
+from rolling_metrics import WINDOWS, rolling_metrics, rolling_metrics_pandas
+
+
+# 合成价格面板，其中一个价格缺失（包含它的窗口结果为 NaN）
+@pytest.fixture
+def prices():
+    frame = synthetic_prices(3, 2)
+    frame.iloc[100, 1] = np.nan
+    return frame
+
+
+def assert_matches_pandas(prices):
+    result = rolling_metrics(prices)
+    expected = rolling_metrics_pandas(prices)
+    assert result.keys() == expected.keys()
+    for key, frame in expected.items():
+        pd.testing.assert_frame_equal(result[key], frame, rtol=1e-8, atol=1e-10, check_freq=False)
+
+
+def test_rolling_metrics_matches_pandas(prices):
+    assert_matches_pandas(prices)
+
+
+# 历史比最长窗口还短时，较长窗口的结果全为 NaN，行数仍与收益率的日期一致
+@pytest.mark.parametrize('rows', [100, WINDOWS[-1], 2])
+def test_short_history_matches_pandas(prices, rows):
+    short = prices.iloc[:rows]
+    assert_matches_pandas(short)
+    assert rolling_metrics(short)[('return', WINDOWS[-1])].isna().all().all()
@@ -0,0 +1,185 @@
+import time
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from price_store import load_prices, store_path, store_version, sync_csv
+from rolling_metrics import WINDOWS, rolling_metrics
+from stoxx_metrics import INDEX_NAMES
+
+# 看板中的交互式折线图：价格和滚动指标的长历史不全部发给浏览器，
+# 按当前缩放范围截取后用 LTTB（Largest-Triangle-Three-Buckets）降采样到 RESOLUTION 个点；
+# 范围内的点数不超过 RESOLUTION 时（放大到较短的区间）直接返回该区间的全部原始数据
+# 每个 (序列, 指标, 范围, 分辨率) 的结果都有缓存，价格存储更新后缓存键随之改变
+# 页面请求只读取看板后台刷新线程已经同步好的价格存储，不在请求中解析 CSV、改写存储
+RESOLUTION = 1000
+
+# 可选的视图：'price' 为价格，其余为 rolling_metrics 的 (指标, 窗口)
+VIEWS = {'price': '价格'}
+VIEWS.update({f'{metric}:{window}': f'{label}（{window} 日）'
+              for metric, label in (('return', '滚动年化收益率'), ('volatility', '滚动年化波动率'),
+                                    ('sharpe', '滚动 Sharpe Ratio'), ('max_drawdown', '滚动最大回撤'),
+                                    ('beta', '滚动 beta'))
+              for window in WINDOWS})
+
+
+# LTTB 降采样，返回保留的点的下标（升序，包含首尾两点）
+# 中间的点分为 n_out - 2 个桶，每个桶选出与上一个已选点、下一个桶平均点所围三角形面积最大的点
+def lttb(x, y, n_out):
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    edges = (np.arange(n_out - 1) * (n - 2) / (n_out - 2)).astype(np.int64) + 1
+    edges[-1] = n - 1
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # 下一个桶的平均点；最后一个桶之后是末尾的点
+        if i + 2 < len(edges):
+            next_x, next_y = x[hi:edges[i + 2]].mean(), y[hi:edges[i + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        area = np.abs((x[a] - next_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (next_y - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+# 整个面板：价格或某个滚动指标（日期 × 序列）
+def view_panel(file_path, view, source_key):
+    if view == 'price':
+        return _prices(file_path, source_key)
+    metric, window = view.split(':')
+    return _rolling(file_path, source_key)[(metric, int(window))]
+
+
+# 一个序列在 [start, end] 内的降采样结果 (日期, 数值)，start / end 为 None 表示不限
+# 缓存的数组由多个请求共享，调用方不应修改
+@lru_cache(maxsize=1024)
+def view_series(file_path, view, column, start, end, resolution, source_key):
+    series = view_panel(file_path, view, source_key)[column].dropna()
+    dates = series.index.values
+    lo = 0 if start is None else int(np.searchsorted(dates, np.datetime64(start), side='left'))
+    hi = len(dates) if end is None else int(np.searchsorted(dates, np.datetime64(end), side='right'))
+    dates, values = dates[lo:hi], series.to_numpy()[lo:hi]
+
+    keep = lttb(dates.astype('datetime64[ns]').astype(np.int64), values, resolution)
+    return dates[keep], values[keep]
+
+
+# 生成 dcc.Graph 的 figure：每个序列一条线，范围为 [start, end]（None 表示完整历史）
+def timeseries_figure(file_path, view='price', start=None, end=None, resolution=RESOLUTION):
+    source_key = _source_key(file_path)
+    start, end = _round_range(start, end)
+    traces = []
+    for column in view_panel(file_path, view, source_key).columns:
+        dates, values = view_series(file_path, view, column, start, end, resolution, source_key)
+        traces.append({'type': 'scattergl', 'mode': 'lines', 'name': INDEX_NAMES.get(column, column),
+                       'x': np.datetime_as_string(dates, unit='D').tolist(), 'y': values.tolist()})
+
+    xaxis = {'type': 'date'}
+    if start is not None or end is not None:
+        xaxis['range'] = [start, end]
+    return {'data': traces,
+            'layout': {'title': {'text': VIEWS[view]}, 'xaxis': xaxis, 'uirevision': view,
+                       'margin': {'l': 50, 'r': 20, 't': 50, 'b': 40}}}
+
+
+# 从 dcc.Graph 的 relayoutData 中取出横轴范围，恢复完整范围（autorange）时返回 (None, None)；
+# 事件不涉及横轴（autosize、切换拖动模式、只缩放纵轴等）时返回 None，表示横轴范围没有变化
+def zoom_range(relayout_data):
+    if not relayout_data:
+        return None
+    if relayout_data.get('xaxis.autorange'):
+        return None, None
+    if 'xaxis.range[0]' in relayout_data:
+        return relayout_data['xaxis.range[0]'], relayout_data['xaxis.range[1]']
+    if 'xaxis.range' in relayout_data:
+        return tuple(relayout_data['xaxis.range'])
+    return None
+
+
+# 范围向外取整到整日，同一天内的细微拖动复用同一份缓存
+def _round_range(start, end):
+    start = None if start is None else pd.Timestamp(start).floor('D').strftime('%Y-%m-%d')
+    end = None if end is None else pd.Timestamp(end).ceil('D').strftime('%Y-%m-%d')
+    return start, end
+
+
+# 价格存储的版本 (构建编号, 行数)，作为缓存键的一部分；存储还不存在时（没有后台刷新线程）先同步一次
+def _source_key(file_path):
+    store_dir = store_path(file_path)
+    version = store_version(store_dir)
+    if version is None:
+        sync_csv(file_path, store_dir)
+        version = store_version(store_dir)
+    return version
+
+
+@lru_cache(maxsize=2)
+def _prices(file_path, source_key):
+    return load_prices(store_path(file_path))
+
+
+@lru_cache(maxsize=2)
+def _rolling(file_path, source_key):
+    return rolling_metrics(_prices(file_path, source_key))
+
+
+if __name__ == '__main__':
+    # 在合成的长历史上对比完整数据和降采样后的数据量，以及首次计算和缓存命中的耗时
+    # python timeseries_view.py [--series 20] [--years 40]
+    import argparse
+    import json
+    import os
+    import tempfile
+
+    from price_store import load_prices_cached, synthetic_prices
+
+    parser = argparse.ArgumentParser(description='交互式折线图降采样的基准测试')
+    parser.add_argument('--series', type=int, default=20, help='合成面板的序列数')
+    parser.add_argument('--years', type=int, default=40, help='合成面板的年数')
+    args = parser.parse_args()
+
+    # LTTB 保留首尾两点，且不超过指定点数
+    x = np.arange(10000)
+    y = np.sin(x / 300) + np.random.default_rng(0).normal(0, 0.1, len(x))
+    keep = lttb(x, y, 500)
+    assert len(keep) == 500 and keep[0] == 0 and keep[-1] == len(x) - 1 and np.all(np.diff(keep) > 0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        file_path = os.path.join(tmp, 'synthetic.csv')
+        synthetic_prices(args.series, args.years).to_csv(file_path)
+        panel = load_prices_cached(file_path)
+
+        full = {'data': [{'type': 'scattergl', 'x': panel.index.strftime('%Y-%m-%d').tolist(),
+                          'y': panel[column].tolist()} for column in panel.columns]}
+        start = time.perf_counter()
+        figure = timeseries_figure(file_path)
+        cold_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        timeseries_figure(file_path)
+        warm_ms = (time.perf_counter() - start) * 1000
+
+        # 放大到 3 个月：返回该区间的全部原始数据
+        zoom_start, zoom_end = panel.index[-63].strftime('%Y-%m-%d'), panel.index[-1].strftime('%Y-%m-%d')
+        zoomed = timeseries_figure(file_path, start=zoom_start, end=zoom_end)
+        np.testing.assert_array_equal(zoomed['data'][0]['y'], panel.iloc[-63:, 0].to_numpy())
+
+        start = time.perf_counter()
+        timeseries_figure(file_path, view='volatility:252')
+        rolling_ms = (time.perf_counter() - start) * 1000
+
+        print(f"合成面板 {panel.shape[0]} 天 × {panel.shape[1]} 个序列:")
+        print(f"  {'完整数据':<16} {len(json.dumps(full)) / 1e6:>8.2f} MB")
+        print(f"  {'LTTB 降采样':<14} {len(json.dumps(figure)) / 1e6:>8.2f} MB  ({RESOLUTION} 点 / 序列)")
+        print(f"  {'放大到 3 个月':<13} {len(zoomed['data'][0]['y']):>8d} 点（完整分辨率）")
+        print(f"  {'首次生成':<16} {cold_ms:>8.1f} ms")
+        print(f"  {'缓存命中':<16} {warm_ms:>8.1f} ms")
+        print(f"  {'滚动波动率（含计算）':<10} {rolling_ms:>8.1f} ms")
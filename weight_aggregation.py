@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+
+
+# 在一次读取的持仓数据上同时计算多个维度的权重
+# dimensions 中的元素可以是单个列名（如 'INDUSTRY_GROUP'），也可以是列名元组（如 ('COUNTRY', 'INDUSTRY_GROUP')）；
+# 每个标签列只编码一次为整数代码，各维度的权重用 np.bincount 一次累加得到。
+# top_n 不为空时只保留权重最大的 top_n 组（argpartition 选出，不做全量排序），其余合并为 others_label。
+# 返回 {维度: DataFrame}，DataFrame 的列为维度列加 weight_column，按权重从大到小排列
+def aggregate_weights(data, dimensions, weight_column, top_n=None, others_label='Others'):
+    weights = numeric_weights(data[weight_column]).to_numpy(dtype=float)
+    weights = np.where(np.isnan(weights), 0.0, weights)
+
+    codes = {}
+    results = {}
+    for dimension in dimensions:
+        columns = dimension if isinstance(dimension, tuple) else (dimension,)
+        for column in columns:
+            if column not in codes:
+                codes[column] = _encode(data[column])
+
+        group_codes, group_labels = _combine([codes[column] for column in columns])
+        sums = np.bincount(group_codes[group_codes >= 0], weights=weights[group_codes >= 0],
+                           minlength=len(group_labels[0]))
+
+        results[dimension] = _top_n_table(columns, group_labels, sums, weight_column, top_n, others_label)
+    return results
+
+
+# 权重列转为数值：带百分号的文本按百分比换算，无法解析的值（如 '--'）记为缺失
+# 文本只对不重复的取值解析一次，再按代码展开到每一行
+def numeric_weights(series):
+    if pd.api.types.is_numeric_dtype(series):
+        return series
+    codes, uniques = _encode(series)
+    text = pd.Series(uniques, dtype=object).astype(str).str.strip()
+    percent = text.str.endswith('%').to_numpy()
+    parsed = pd.to_numeric(text.str.rstrip('%'), errors='coerce').to_numpy(dtype=float)
+    parsed = np.where(percent, parsed / 100, parsed)
+    values = np.where(codes >= 0, parsed[np.maximum(codes, 0)] if len(parsed) else np.nan, np.nan)
+    return pd.Series(values, index=series.index, name=series.name)
+
+
+# 按映射表转换标签（例如国家英文名转中文名），映射表中没有的标签保持不变
+# 每个不重复的标签只查找一次，再按代码展开到每一行
+def translate_labels(series, mapping):
+    codes, labels = _encode(series)
+    translated = np.array([mapping.get(label, label) for label in labels], dtype=object)
+    values = np.full(len(codes), None, dtype=object)
+    values[codes >= 0] = translated[codes[codes >= 0]]
+    return pd.Series(values, index=series.index, name=series.name)
+
+
+# 标签列编码为 (代码, 类别)，缺失值代码为 -1；已经是 Categorical 的列直接使用其代码
+def _encode(series):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy(), series.cat.categories.to_numpy()
+    group_codes, labels = pd.factorize(series, sort=False)
+    return group_codes, np.asarray(labels)
+
+
+# 多个列的代码组合为一个组代码，只保留实际出现的组合
+def _combine(encoded):
+    group_codes, labels = encoded[0]
+    if len(encoded) == 1:
+        return group_codes, [labels]
+
+    valid = np.ones(len(group_codes), dtype=bool)
+    combined = np.zeros(len(group_codes), dtype=np.int64)
+    for column_codes, column_labels in encoded:
+        valid &= column_codes >= 0
+        combined = combined * len(column_labels) + column_codes
+
+    present, inverse = np.unique(combined[valid], return_inverse=True)
+    group_codes = np.full(len(combined), -1, dtype=np.int64)
+    group_codes[valid] = inverse
+
+    # 从组合代码中还原每一列的标签
+    group_labels = []
+    remainder = present
+    for column_codes, column_labels in reversed(encoded):
+        group_labels.append(column_labels[remainder % len(column_labels)])
+        remainder = remainder // len(column_labels)
+    return group_codes, group_labels[::-1]
+
+
+# 选出权重最大的 top_n 组，剩余部分合并为一行
+def _top_n_table(columns, group_labels, sums, weight_column, top_n, others_label):
+    if top_n is not None and len(sums) > top_n:
+        top = np.argpartition(-sums, top_n - 1)[:top_n]
+        top = top[np.argsort(-sums[top], kind='stable')]
+        others = sums.sum() - sums[top].sum()
+    else:
+        top = np.argsort(-sums, kind='stable')
+        others = None
+
+    table = pd.DataFrame({column: labels[top] for column, labels in zip(columns, group_labels)})
+    table[weight_column] = sums[top]
+    if others is not None:
+        others_row = {column: [others_label] for column in columns}
+        others_row[weight_column] = [others]
+        table = pd.concat([table, pd.DataFrame(others_row)], ignore_index=True)
+    return table